@@ -1,16 +1,34 @@
 # Professional Asahi CV Formatter - Clean & Simple Design
+#
+# Streamlit front end; the PII engine, extractors and generator live in the asahi_cv package.
 import streamlit as st
-from docx import Document
-from docx.shared import Inches, Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.shared import OxmlElement, qn
-from io import BytesIO
-import fitz  # PyMuPDF
-import re
-from PIL import Image
-from collections import defaultdict
-import time
+import hashlib
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from asahi_cv.batch import name_from_file_name
+from asahi_cv.diskcache import FormatCache
+from asahi_cv.document import LOGO_PATH, load_logo_asset, output_file_name
+from asahi_cv.export import export_zip
+from asahi_cv.incremental import IncrementalCleaner
+from asahi_cv.instrument import PipelineTrace
+from asahi_cv.ocr import OCR_CACHE_SUBDIR, OCR_LANGUAGES, PageOCR, TesseractEngine
+from asahi_cv.pii import PIIDetector
+from asahi_cv.spool import SPOOL_MAX_BYTES, file_path, spooled_file
+from asahi_cv.workers import extract_upload, render_upload, worker_pool
+
+# Per-process cap on cached uploads; least recently used entries are evicted first
+CACHE_MAX_ENTRIES = 64
+CACHE_TTL_SECONDS = 60 * 60
+
+# Warm worker processes shared by every session for extraction and document generation
+FORMAT_WORKERS = min(4, os.cpu_count() or 1)
+# Processes per long PDF for page-parallel extraction (started by the worker handling it)
+PDF_WORKERS = min(4, os.cpu_count() or 1)
+SHORTLIST_ZIP_NAME = "Asahi_CV_Shortlist.zip"
+DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "asahi_cv")
+# Tesseract languages for scanned PDF pages (e.g. "eng+jpn")
+OCR_LANG = os.environ.get("ASAHI_CV_OCR_LANG", OCR_LANGUAGES)
 
 # --- Professional Clean CSS Design ---
 def apply_professional_css():
@@ -185,247 +203,284 @@ def apply_professional_css():
     </style>
     """, unsafe_allow_html=True)
 
-# --- Advanced PII Detection Class ---
-class PIIDetector:
-    def __init__(self):
-        self.patterns = {
-            'email': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
-            'phone': re.compile(r'(?:\+?1[-.\s]?)?\(?[0-9]{3}\)?[-.\s]?[0-9]{3}[-.\s]?[0-9]{4}|\+\d{1,3}[-.\s]?\d{1,4}[-.\s]?\d{1,4}[-.\s]?\d{1,9}'),
-            'address': re.compile(r'\d+\s+[\w\s,.-]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|court|ct|place|pl)(?:\s+(?:apt|apartment|unit|#)\s*\w+)?', re.IGNORECASE),
-            'zip_code': re.compile(r'\b\d{5}(?:-\d{4})?\b'),
-            'height': re.compile(r'\b(?:\d+\'\s*\d+\"|\d+\s*ft\s*\d+\s*in|\d+\.\d+\s*m|\d+\s*cm)\b', re.IGNORECASE),
-            'weight': re.compile(r'\b\d+(?:\.\d+)?\s*(?:lbs?|pounds?|kg|kilograms?)\b', re.IGNORECASE),
-            'date_of_birth': re.compile(r'\b(?:DOB|Date of Birth|Born):?\s*(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', re.IGNORECASE),
-            'ssn': re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),
-            'linkedin': re.compile(r'linkedin\.com/in/[\w-]+', re.IGNORECASE),
-	    'name': re.compile(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+$'),
+# --- Cached Pipeline Stages ---
+# Name/age edits rerun the whole script, so the expensive stages are cached on the SHA-256
+# of the uploaded bytes. The upload and text are passed as underscore arguments so Streamlit
+# doesn't hash them again; only the digest and file name form the cache key.
+# Each stage also returns the StageRecords of the run that filled the cache; track_memory is
+# part of the key so turning diagnostics on measures peak memory rather than reusing a run without it.
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
 
-        }
-        
-        self.personal_keywords = [
-            'home address', 'residential address', 'current address', 'permanent address',
-            'contact number', 'mobile number', 'cell phone', 'telephone', 'tel. no', 'phone',
-            'date of birth', 'dob', 'born on', 'age:', 'years old',
-            'marital status', 'married', 'single', 'divorced',
-            'nationality', 'citizen', 'passport', 'visa status',
-            'height:', 'weight:', 'blood type', 'emergency contact',
-            'email address', 'e-mail', 'gmail', 'yahoo','name','full name', '@'
-        ]
-        
-        # Patterns to identify lines containing personal information that should be completely removed
-        self.pii_line_patterns = [
-            re.compile(r'.*(?:tel\.?\s*no\.?|phone|mobile|contact).*?[\+\(]?\d{1,4}[\s\-\(\)]*\d{3,4}[\s\-]*\d{3,4}.*', re.IGNORECASE),
-            re.compile(r'.*email.*?[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}.*', re.IGNORECASE),
-            re.compile(r'.*(?:address|location).*?\d+.*?(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd).*', re.IGNORECASE),
-            re.compile(r'.*(?:height|weight|born|dob|date of birth).*', re.IGNORECASE),
-            re.compile(r'.*(?:nationality|citizenship|passport|visa).*', re.IGNORECASE),
-            re.compile(r'.*(?:marital|married|single|divorced).*', re.IGNORECASE),
-        ]
-    
-    def detect_names(self, text):
-        detected_names = set()
-        name_patterns = [
-            # Regular capitalized names (John Doe)
-            re.compile(r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]*)*)\s*$', re.MULTILINE),
-            # Names with labels
-            re.compile(r'(?:Name|Full Name|Candidate):?\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]*)+)', re.IGNORECASE),
-            # Names at start of line
-            re.compile(r'^([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', re.MULTILINE),
-            # ALL CAPS NAMES (NEW PATTERN)
-            re.compile(r'^([A-Z]{2,}(?:\s+[A-Z]{2,})+)\s*$', re.MULTILINE),
-            # Mixed case ALL CAPS names
-            re.compile(r'(?:Name|Full Name|Candidate):?\s*([A-Z]{2,}(?:\s+[A-Z]{2,})+)', re.IGNORECASE),
-            # ALL CAPS at start of line
-            re.compile(r'^([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,})*)', re.MULTILINE),
-        ]
-        
-        for pattern in name_patterns:
-            matches = pattern.findall(text)
-            for match in matches:
-                if isinstance(match, tuple):
-                    match = match[0] if match[0] else match[1]
-                if not any(word.lower() in ['university', 'college', 'company', 'corporation', 'inc', 'ltd', 'experience', 'education', 'skills', 'objective', 'summary', 'profile', 'references', 'qualifications'] for word in match.split()):
-                    # For ALL CAPS, ensure it's at least 2 words and each word is at least 2 characters
-                    if match.isupper():
-                        words = match.split()
-                        if len(words) >= 2 and all(len(word) >= 2 for word in words):
-                            detected_names.add(match.strip())
-                    # For regular names, ensure at least 2 words
-                    elif len(match.split()) >= 2:
-                        detected_names.add(match.strip())
-        
-        return list(detected_names)
-    
-    def detect_all_pii(self, text):
-        detected_pii = defaultdict(list)
-        # Don't include names in the returned PII
-        
-        for pii_type, pattern in self.patterns.items():
-            matches = pattern.findall(text)
-            if matches:
-                detected_pii[pii_type] = list(set(matches))
-        
-        personal_info_lines = []
-        lines = text.split('\n')
-        for line in lines:
-            if any(keyword in line.lower() for keyword in self.personal_keywords):
-                personal_info_lines.append(line.strip())
-        
-        if personal_info_lines:
-            detected_pii['personal_info_lines'] = personal_info_lines
-        
-        return dict(detected_pii)
-    
-    def remove_pii(self, text, detected_pii):
-        cleaned_text = text
-        removal_count = 0
-        
-        # Still detect and remove names internally, but don't show them in PII report
-        detected_names = self.detect_names(text)
-        for name in detected_names:
-            if name and len(name.strip()) > 2:
-                # Use word boundary matching for better accuracy
-                pattern = re.compile(r'\b' + re.escape(name) + r'\b', re.IGNORECASE)
-                if pattern.search(cleaned_text):
-                    cleaned_text = pattern.sub('', cleaned_text)
-                    removal_count += 1
-        
-        # Process line by line to completely remove PII-containing lines
-        lines = cleaned_text.split('\n')
-        filtered_lines = []
-        
-        for line in lines:
-            line_contains_pii = False
-            original_line = line.strip()
-            
-            # Check if line matches any PII line patterns (complete removal)
-            for pii_pattern in self.pii_line_patterns:
-                if pii_pattern.match(line):
-                    line_contains_pii = True
-                    removal_count += 1
-                    break
-            
-            # Check for individual PII items in the line
-            if not line_contains_pii:
-                for pii_type, items in detected_pii.items():
-                    for item in items:
-                        if item and len(str(item).strip()) > 1:
-                            if str(item).lower() in line.lower():
-                                line_contains_pii = True
-                                removal_count += 1
-                                break
-                    if line_contains_pii:
-                        break
-            
-            # Check for personal keywords that indicate the entire line should be removed
-            if not line_contains_pii:
-                line_lower = line.lower()
-                for keyword in self.personal_keywords:
-                    if keyword in line_lower:
-                        # Additional check to avoid removing work-related lines
-                        if not any(work_keyword in line_lower for work_keyword in ['experience', 'work', 'employment', 'company', 'project', 'skill', 'education', 'university', 'college']):
-                            line_contains_pii = True
-                            removal_count += 1
-                            break
-            
-            # Only keep lines that don't contain PII
-            if not line_contains_pii and original_line:
-                filtered_lines.append(original_line)
-        
-        cleaned_text = '\n'.join(filtered_lines)
-        
-        # Clean up extra whitespace and empty lines
-        cleaned_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', cleaned_text)
-        cleaned_text = cleaned_text.strip()
-        
-        return cleaned_text, removal_count
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def extract_text_cached(digest, file_name, ocr_fingerprint, track_memory, _upload):
+    # Runs in a pool worker; large uploads go over as a temporary file rather than pickled bytes.
+    # ocr_fingerprint keys the cache on whether (and how) scanned pages were OCR'd.
+    if _upload.size > SPOOL_MAX_BYTES:
+        _upload.seek(0)
+        with file_path(_upload, suffix=os.path.splitext(file_name)[1]) as path:
+            return run_in_worker(extract_upload, path, file_name, use_ocr=bool(ocr_fingerprint),
+                                 track_memory=track_memory)
+    return run_in_worker(extract_upload, _upload.getvalue(), file_name, use_ocr=bool(ocr_fingerprint),
+                         track_memory=track_memory)
 
-# --- Helper Functions ---
-def extract_text_from_pdf(file):
-    text = ""
-    try:
-        with fitz.open(stream=file.read(), filetype="pdf") as doc:
-            for page in doc:
-                text += page.get_text()
-    except Exception as e:
-        st.error(f"Error reading PDF: {str(e)}")
-        return ""
-    return text
+# A re-upload of an edited CV has a new digest; the session's IncrementalCleaner then only
+# rescans the lines that changed since the previous upload
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def clean_text_cached(digest, ocr_fingerprint, track_memory, _raw_text, _cleaner):
+    # Keyed like extract_text_cached: turning OCR on changes the raw text of the same upload
+    trace = PipelineTrace(track_memory=track_memory)
+    return _cleaner.clean(_raw_text, trace=trace), trace.records
+
+# --- Shared Resources ---
+# One pool of warm workers for every session: each worker has PyMuPDF, python-docx, the PII
+# detector and the logo loaded before its first job, and a session's script thread only waits
+# for results, so one long PDF doesn't stall the other recruiters' pages
+@st.cache_resource(show_spinner=False)
+def get_worker_pool():
+    options = {"logo_path": str(LOGO_PATH), "pdf_workers": PDF_WORKERS}
+    if get_page_ocr() is not None:
+        options["ocr_languages"] = OCR_LANG
+        # OCR'd pages are kept next to the formatted CVs, so a restart doesn't OCR them again
+        if format_cache_dir():
+            options["ocr_cache_dir"] = os.path.join(format_cache_dir(), OCR_CACHE_SUBDIR)
+    return worker_pool(FORMAT_WORKERS, options)
 
-def extract_text_from_docx(file):
+def run_in_worker(func, *args, **kwargs):
+    pool = get_worker_pool()
     try:
-        doc = Document(file)
-        return "\n".join([para.text for para in doc.paragraphs])
-    except Exception as e:
-        st.error(f"Error reading DOCX: {str(e)}")
-        return ""
+        return pool.submit(func, *args, **kwargs).result()
+    except BrokenProcessPool:
+        worker_pool_crashed(pool, "this CV")
+
+def worker_pool_crashed(pool, what):
+    # A worker died (e.g. out of memory); the next run starts a fresh pool
+    pool.shutdown(wait=False)
+    get_worker_pool.clear()
+    st.error(f"The formatter stopped unexpectedly while processing {what}. Please try again.")
+    st.stop()
+
+# Compiled once and shared: the detector holds no per-document state
+@st.cache_resource(show_spinner=False)
+def get_pii_detector():
+    return PIIDetector()
+
+# Formatted CVs persisted on disk across restarts and shared by every session; set
+# ASAHI_CV_CACHE_DIR to an empty string to turn the cache off
+def format_cache_dir():
+    return os.environ.get("ASAHI_CV_CACHE_DIR", DISK_CACHE_DIR)
 
-def abbreviate_name_age(full_name, age):
+@st.cache_resource(show_spinner=False)
+def get_format_cache():
+    directory = format_cache_dir()
+    if not directory:
+        return None
+    return FormatCache(directory, logo_path=LOGO_PATH)
+
+# None when no OCR engine is installed; scanned pages then come back empty
+@st.cache_resource(show_spinner=False)
+def get_page_ocr():
+    engine = TesseractEngine(languages=OCR_LANG)
+    if not engine.available():
+        return None
+    return PageOCR(engine, workers=PDF_WORKERS)
+
+def show_diagnostics(trace, worker_peak_rss):
+    with st.expander("Diagnostics"):
+        st.dataframe(
+            [{"Stage": r.stage, "Time (ms)": round(r.seconds * 1000, 1), "Bytes": r.bytes, "Lines": r.lines,
+              "Peak memory (KB)": round(r.peak_memory / 1024, 1) if r.peak_memory is not None else None}
+             for r in trace.records],
+            hide_index=True,
+        )
+        st.caption(f"Total: {trace.total_seconds * 1000:.1f} ms (extraction and PII stages are timed on their first, uncached run)")
+        if worker_peak_rss:
+            st.caption(f"Peak worker memory (RSS) for this CV: {worker_peak_rss / (1024 * 1024):.0f} MB")
+
+def require_logo():
+    # Load logo (decoded once per process); without it no CV can be generated
     try:
-        name_parts = [part.strip() for part in full_name.strip().split() if part.strip()]
-        if not name_parts:
-            return f"N.A.{age}yrs"
-        initials = ''.join([part[0].upper() + '.' for part in name_parts])
-        return f"{initials} {age}yrs"
-    except Exception:
-        return f"N.A.{age}yrs"
+        load_logo_asset(LOGO_PATH)
+    except FileNotFoundError:
+        st.markdown("""
+        <div class="status-warning">
+            <strong>Warning:</strong> Logo file 'asahi_logo-04.jpg' not found. Please ensure it's in the same directory.
+        </div>
+        """, unsafe_allow_html=True)
+        st.stop()
 
-def add_header_with_logo(doc, logo_img):
-    section = doc.sections[0]
-    header = section.header
-    
-    for paragraph in header.paragraphs:
-        paragraph.clear()
-    
-    logo_para = header.add_paragraph()
-    logo_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    
-    tab_stops = logo_para.paragraph_format.tab_stops
-    tab_stops.add_tab_stop(Inches(6.5), WD_ALIGN_PARAGRAPH.RIGHT)
-    
-    logo_run = logo_para.add_run("\t")
-    
-    image_stream = BytesIO()
-    logo_img.save(image_stream, format='PNG')
-    image_stream.seek(0)
-    logo_run.add_picture(image_stream, width=Inches(2.634), height=Inches(0.508))
-    
-    section.header_distance = Inches(0.4)
+def show_footer():
+    st.markdown('<div class="footer">©Asahi Kogyo Co., Ltd. Osaka Office</div>', unsafe_allow_html=True)
 
-def generate_asahi_cv(cleaned_text, logo_img, candidate_name, age):
-    doc = Document()
-    
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1.2)
-        section.bottom_margin = Inches(0.8)
-        section.left_margin = Inches(0.8)
-        section.right_margin = Inches(0.8)
-    
-    add_header_with_logo(doc, logo_img)
-    
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Calibri'
-    font.size = Pt(11)
-    
-    name_paragraph = doc.add_paragraph()
-    name_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    name_paragraph.paragraph_format.space_after = Pt(24)
+def show_file_loaded(file_name, word_count):
+    # Show file loaded successfully in plain text
+    st.markdown(f"""
+    <div class="status-success">
+        File loaded successfully: {file_name} ({word_count} words)
+    </div>
+    """, unsafe_allow_html=True)
+
+def format_upload(uploaded_file, digest, candidate_name, age, trace, format_cache=None, cache_key=None, ocr=None):
+    # Returns the .docx bytes and the peak RSS of the workers that ran the stages
+    # Extract text (cached per upload content)
+    ocr_fingerprint = ocr.fingerprint if ocr else ""
+    extraction, records, extract_peak = extract_text_cached(digest, uploaded_file.name, ocr_fingerprint,
+                                                            trace.track_memory, uploaded_file)
+    trace.records.extend(records)
+    if extraction.error:
+        st.error(extraction.error)
+    for warning in extraction.warnings:
+        st.warning(warning)
+    raw_text = extraction.text
     
-    name_run = name_paragraph.add_run(abbreviate_name_age(candidate_name, age))
-    name_run.font.name = 'ＭＳ 明朝'
-    name_run.font.size = Pt(16)
-    name_run.font.bold = True
+    if not raw_text.strip():
+        st.markdown("""
+        <div class="status-warning">
+            <strong>Error:</strong> No text could be extracted from the file. Please check the file format.
+        </div>
+        """, unsafe_allow_html=True)
+        st.stop()
     
-    doc.add_paragraph()
+    word_count = len(raw_text.split())
+    show_file_loaded(uploaded_file.name, word_count)
     
-    content_lines = [line.strip() for line in cleaned_text.strip().split("\n") if line.strip()]
-    for line in content_lines:
-        if line.strip():
-            doc.add_paragraph(line.strip())
+    # Auto-process without button
+    with st.spinner("Processing CV..."):
+        # Use the manually entered candidate name
+        
+        # Detect and remove ALL PII including names (cached per upload content)
+        cleaner = st.session_state.setdefault("pii_cleaner", IncrementalCleaner(get_pii_detector()))
+        (cleaned_text, removal_count), records = clean_text_cached(digest, ocr_fingerprint, trace.track_memory,
+                                                                     raw_text, cleaner)
+        trace.records.extend(records)
+        cache_writer = format_cache.writer(cache_key) if format_cache else None
+        try:
+            if cache_writer is not None:
+                cache_writer.write_text("extracted", raw_text)
+                cache_writer.write_text("cleaned", cleaned_text)
+            # The raw text isn't needed once cleaned
+            raw_text = None
+            
+            # Generate document with only abbreviation in header (st.download_button keeps its
+            # own copy of the bytes, so they are handed over without another buffer)
+            docx_bytes, records, render_peak = run_in_worker(render_upload, cleaned_text, candidate_name, age,
+                                                               track_memory=trace.track_memory)
+            trace.records.extend(records)
+            if cache_writer is not None:
+                cache_writer.write_docx(docx_bytes)
+                cache_writer.commit({
+                    "file_name": uploaded_file.name,
+                    "output_name": output_file_name(candidate_name, age),
+                    "word_count": word_count,
+                    "removal_count": removal_count,
+                    "warnings": extraction.warnings,
+                })
+        finally:
+            if cache_writer is not None:
+                cache_writer.abort()
+    return docx_bytes, max(extract_peak, render_peak)
+
+def show_download(docx_bytes, candidate_name, age):
+    # Show simple completion message
+    st.markdown("""
+    <div class="status-success">
+        CV Processing Complete!
+    </div>
+    """, unsafe_allow_html=True)
     
-    return doc
+    # Download with abbreviation filename
+    file_name = output_file_name(candidate_name, age)
+    st.download_button(
+        label="Download Formatted CV",
+        data=docx_bytes,
+        file_name=file_name,
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    )
+
+# --- Shortlist Export ---
+def shortlist_export(ocr=None):
+    uploaded_files = st.file_uploader(
+        "📄 Choose CV files (PDF or DOCX)",
+        type=["docx", "pdf"],
+        accept_multiple_files=True,
+        help="Upload every CV on the shortlist; they are formatted together into one ZIP"
+    )
+    if not uploaded_files:
+        return
+
+    # Names are pre-filled from the file names (John_Doe.pdf -> John Doe)
+    st.markdown("### 👥 Candidate Information")
+    candidates = st.data_editor(
+        [{"File": f.name, "Candidate Full Name": name_from_file_name(f.name), "Age": None} for f in uploaded_files],
+        column_config={
+            "File": st.column_config.TextColumn(disabled=True),
+            "Candidate Full Name": st.column_config.TextColumn(required=True),
+            "Age": st.column_config.NumberColumn(min_value=18, max_value=99, step=1, required=True),
+        },
+        hide_index=True,
+        num_rows="fixed",
+    )
+    if not all(str(row["Candidate Full Name"] or "").strip() and row["Age"] for row in candidates):
+        st.markdown("""
+        <div class="status-info">
+            <strong>Ready to process:</strong> Please provide a name and age for every CV to continue.
+        </div>
+        """, unsafe_allow_html=True)
+        return
+
+    # The finished ZIP is kept in the session, so the download survives reruns until the
+    # uploads or the table change
+    jobs = [{"file": f.getvalue(), "file_name": f.name, "name": row["Candidate Full Name"].strip(), "age": int(row["Age"])}
+            for f, row in zip(uploaded_files, candidates)]
+    signature = hashlib.sha256(repr([(file_digest(job["file"]), job["name"], job["age"]) for job in jobs]
+                                    + [ocr.fingerprint if ocr else ""]).encode()).hexdigest()
+    export = st.session_state.get("shortlist_export")
+    if export is None or export["signature"] != signature:
+        if not st.button(f"Format {len(jobs)} CVs into a ZIP", type="primary"):
+            return
+        require_logo()
+        progress = st.progress(0.0, text=f"Formatting {len(jobs)} CVs...")
+        steps = st.container()
+
+        def on_result(done, total, result):
+            progress.progress(done / total, text=f"{done}/{total} CVs formatted")
+            if result["error"]:
+                steps.error(f"{result['file']}: {result['error']}")
+            else:
+                steps.markdown(f'<div class="progress-step"><span class="step-check">✓</span>{result["file"]} → {result["output"]}</div>',
+                               unsafe_allow_html=True)
+
+        archive = spooled_file()
+        pool = get_worker_pool()
+        try:
+            results = export_zip(jobs, archive, on_result=on_result, ocr_languages=ocr.engine.languages if ocr else "",
+                                 pool=pool)
+        except BrokenProcessPool:
+            worker_pool_crashed(pool, "the shortlist")
+        if any(result["crashed"] for result in results):
+            worker_pool_crashed(pool, "the shortlist")
+        archive.seek(0)
+        export = {"signature": signature, "zip": archive.read(), "results": results}
+        st.session_state["shortlist_export"] = export
+
+    formatted = [result for result in export["results"] if not result["error"]]
+    st.markdown(f"""
+    <div class="status-success">
+        Shortlist ready: {len(formatted)} of {len(export["results"])} CVs formatted
+    </div>
+    """, unsafe_allow_html=True)
+    for result in export["results"]:
+        if result["error"]:
+            st.error(f"{result['file']}: {result['error']}")
+        if result["warnings"]:
+            st.warning(f"{result['file']}: {result['warnings']}")
+    if formatted:
+        st.download_button(
+            label="Download Shortlist ZIP",
+            data=export["zip"],
+            file_name=SHORTLIST_ZIP_NAME,
+            mime="application/zip"
+        )
 
 # --- Main Application ---
 def main():
@@ -436,6 +491,18 @@ def main():
     )
     
     apply_professional_css()
+    # Workers start loading while the recruiter fills in the form
+    get_worker_pool()
+    show_diagnostics_panel = st.sidebar.checkbox("Show diagnostics", help="Per-stage timings and peak memory for the current CV")
+    page_ocr = get_page_ocr()
+    use_ocr = st.sidebar.checkbox(
+        "OCR scanned pages",
+        value=page_ocr is not None,
+        disabled=page_ocr is None,
+        help="Read pages without a text layer (scanned CVs) with OCR" if page_ocr
+        else "Install Tesseract OCR on the server to read scanned CVs",
+    )
+    ocr = page_ocr if use_ocr else None
     
     # Clickable header with hover link symbol effect - FIXED
     st.markdown("""
@@ -456,10 +523,12 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    pii_detector = PIIDetector()
-    
     # Upload section - Clean version without extra spacing
     st.markdown('<div id="upload-section"></div>', unsafe_allow_html=True)
+    if st.toggle("👥 Shortlist mode", help="Format several CVs at once and download them as one ZIP"):
+        shortlist_export(ocr)
+        show_footer()
+        return
     uploaded_file = st.file_uploader(
         "📄 Choose CV file (PDF or DOCX)", 
         type=["docx", "pdf"],
@@ -476,68 +545,31 @@ def main():
     
     # Processing section - Auto-process when file, name and age are provided
     if uploaded_file and candidate_name.strip() and age:
-        # Load logo
-        try:
-            logo_img = Image.open("asahi_logo-04.jpg")
-        except FileNotFoundError:
-            st.markdown("""
-            <div class="status-warning">
-                <strong>Warning:</strong> Logo file 'asahi_logo-04.jpg' not found. Please ensure it's in the same directory.
-            </div>
-            """, unsafe_allow_html=True)
-            st.stop()
-        
-        # Extract text
-        if uploaded_file.name.lower().endswith(".pdf"):
-            raw_text = extract_text_from_pdf(uploaded_file)
-        else:
-            raw_text = extract_text_from_docx(uploaded_file)
+        require_logo()
         
-        if not raw_text.strip():
-            st.markdown("""
-            <div class="status-warning">
-                <strong>Error:</strong> No text could be extracted from the file. Please check the file format.
-            </div>
-            """, unsafe_allow_html=True)
-            st.stop()
+        digest = file_digest(uploaded_file.getbuffer())
+        # Peak memory (tracemalloc) slows every stage down, so it is only recorded for diagnostics
+        trace = PipelineTrace(label=uploaded_file.name, track_memory=show_diagnostics_panel)
         
-        # Show file loaded successfully in plain text
-        st.markdown(f"""
-        <div class="status-success">
-            File loaded successfully: {uploaded_file.name} ({len(raw_text.split())} words)
-        </div>
-        """, unsafe_allow_html=True)
+        # Formatted before (by any recruiter, also before a restart): serve it from disk
+        format_cache = get_format_cache()
+        cache_key = (format_cache.key(digest, candidate_name, age, variant=ocr.fingerprint if ocr else "")
+                     if format_cache else None)
+        with trace.stage("cache_lookup"):
+            cached = format_cache.get(cache_key) if format_cache else None
+        if cached is not None:
+            for warning in cached.meta["warnings"]:
+                st.warning(warning)
+            show_file_loaded(uploaded_file.name, cached.meta["word_count"])
+            docx_bytes = cached.read_docx()
+            worker_peak_rss = 0
+        else:
+            docx_bytes, worker_peak_rss = format_upload(uploaded_file, digest, candidate_name, age, trace,
+                                                        format_cache, cache_key, ocr)
+        show_download(docx_bytes, candidate_name, age)
         
-        # Auto-process without button
-        with st.spinner("Processing CV..."):
-            # Use the manually entered candidate name
-            
-            # Detect and remove ALL PII including names
-            detected_pii = pii_detector.detect_all_pii(raw_text)
-            cleaned_text, removal_count = pii_detector.remove_pii(raw_text, detected_pii)
-            
-            # Generate document with only abbreviation in header
-            final_doc = generate_asahi_cv(cleaned_text, logo_img, candidate_name, age)
-            buffer = BytesIO()
-            final_doc.save(buffer)
-            buffer.seek(0)
-            
-            # Show simple completion message
-            st.markdown("""
-            <div class="status-success">
-                CV Processing Complete!
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Download with abbreviation filename
-            abbreviation = abbreviate_name_age(candidate_name, age).replace(f" {age}yrs", "")
-            file_name = f"Asahi_CV_{abbreviation}.docx"
-            st.download_button(
-                label="Download Formatted CV",
-                data=buffer,
-                file_name=file_name,
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
+        if show_diagnostics_panel:
+            show_diagnostics(trace, worker_peak_rss)
     
     elif uploaded_file or candidate_name.strip() or age:
         st.markdown("""
@@ -547,7 +579,7 @@ def main():
         """, unsafe_allow_html=True)
 
     # Footer
-    st.markdown('<div class="footer">©Asahi Kogyo Co., Ltd. Osaka Office</div>', unsafe_allow_html=True)
+    show_footer()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,7 @@
+# Asahi CV Formatter - Headless batch mode (same as `python -m asahi_cv.batch`)
+import sys
+
+from asahi_cv.batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# Asahi CV Formatter core: PII engine, extractors and DOCX generator, usable without Streamlit.
+#
+# Names are resolved lazily so `import asahi_cv` stays cheap for scripts and pool workers;
+# PyMuPDF, python-docx and Pillow load only when a function that needs them runs.
+from importlib import import_module
+
+_EXPORTS = {
+    'PIIDetector': 'pii',
+    'PIILineScanner': 'pii',
+    'PIISpans': 'pii',
+    'ExtractionResult': 'extract',
+    'extract_text': 'extract',
+    'extract_text_from_pdf': 'extract',
+    'extract_text_from_docx': 'extract',
+    'FormatCache': 'diskcache',
+    'LOGO_PATH': 'document',
+    'LogoAsset': 'document',
+    'load_logo_asset': 'document',
+    'abbreviate_name_age': 'document',
+    'output_file_name': 'document',
+    'generate_asahi_cv': 'document',
+    'export_zip': 'export',
+    'IncrementalCleaner': 'incremental',
+    'PageOCR': 'ocr',
+    'TesseractEngine': 'ocr',
+    'StubEngine': 'ocr',
+    'OCRError': 'ocr',
+    'PipelineTrace': 'instrument',
+    'profile_to': 'instrument',
+    'FormatResult': 'pipeline',
+    'clean_text': 'pipeline',
+    'render_docx': 'pipeline',
+    'save_docx': 'pipeline',
+    'format_cv': 'pipeline',
+    'peak_rss': 'spool',
+    'FormatterService': 'service',
+    'LocalClient': 'service',
+    'worker_pool': 'workers',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
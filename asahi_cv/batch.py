@@ -0,0 +1,282 @@
+# Asahi CV Formatter - Headless batch mode
+#
+# Formats a whole directory of CVs (or a manifest CSV) across a process pool:
+#
+#   python -m asahi_cv.batch intake/ -o formatted/ --age 30 --workers 4
+#   python -m asahi_cv.batch manifest.csv -o formatted/
+#
+# The manifest CSV has the columns: file, name, age (paths are relative to the CSV).
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from .document import LOGO_PATH, output_file_name
+from .instrument import PipelineTrace
+from .ocr import OCR_DPI, OCR_LANGUAGES, TesseractEngine
+from .workers import format_upload, init_worker, worker_state
+
+SUPPORTED_SUFFIXES = (".pdf", ".docx")
+
+# --- Job discovery ---
+def name_from_file_name(file_name):
+    # Without a manifest the candidate name comes from the file name (John_Doe.pdf)
+    return " ".join(Path(file_name).stem.replace("_", " ").replace("-", " ").split())
+
+def jobs_from_directory(input_dir, age):
+    jobs = []
+    for path in sorted(Path(input_dir).iterdir()):
+        if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+            jobs.append({"file": path, "name": name_from_file_name(path.name), "age": age})
+    return jobs
+
+def jobs_from_manifest(manifest_path):
+    manifest_path = Path(manifest_path)
+    jobs = []
+    with open(manifest_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            jobs.append({
+                "file": manifest_path.parent / row["file"].strip(),
+                "name": row["name"].strip(),
+                "age": int(row["age"]),
+            })
+    return jobs
+
+def assign_output_names(jobs):
+    # Identical initials would overwrite each other, so number the repeats in input order
+    seen = {}
+    for job in jobs:
+        file_name = output_file_name(job["name"], job["age"])
+        count = seen.get(file_name.lower(), 0) + 1
+        seen[file_name.lower()] = count
+        if count > 1:
+            stem, suffix = os.path.splitext(file_name)
+            file_name = f"{stem}_{count}{suffix}"
+        job["output_name"] = file_name
+    return jobs
+
+# --- Worker process ---
+def format_one(job, output_dir):
+    started = time.perf_counter()
+    result = {"file": str(job["file"]), "output": "", "removed": 0, "warnings": "", "error": "", "peak_rss_mb": 0.0,
+              "cached": False}
+    profile_path = None
+    if worker_state["profile_dir"]:
+        profile_path = Path(worker_state["profile_dir"]) / (Path(job["output_name"]).stem + ".prof")
+    # The document is written straight to disk (never held whole in memory) and only renamed
+    # into place once formatting succeeded
+    output_path = Path(output_dir) / job["output_name"]
+    partial_path = output_path.with_name(output_path.name + ".part")
+    formatted = None
+    try:
+        with open(partial_path, "wb") as output:
+            formatted = format_upload(
+                job["file"], str(job["file"]), job["name"], job["age"],
+                trace=PipelineTrace(label=str(job["file"]), track_memory=worker_state["track_memory"]),
+                profile_path=profile_path,
+                output=output,
+            )
+        if formatted.ok:
+            os.replace(partial_path, output_path)
+            result["output"] = str(output_path)
+            result["removed"] = formatted.removal_count
+            result["cached"] = formatted.cached
+        else:
+            partial_path.unlink()
+            result["error"] = formatted.error
+    except OSError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    if formatted is not None:
+        result["warnings"] = " ".join(formatted.warnings)
+        result["trace"] = formatted.trace.to_dict()
+        result["peak_rss_mb"] = round(formatted.peak_rss / (1024 * 1024), 1)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def crashed_result(job):
+    # Report row for a document whose worker process died (e.g. a MuPDF crash or an OOM kill)
+    return {"file": str(job["file"]), "output": "", "removed": 0, "warnings": "", "peak_rss_mb": 0.0,
+            "cached": False, "seconds": 0.0, "error": "BrokenProcessPool: the worker process formatting this file died"}
+
+# --- Reporting ---
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def write_report(results, report_path):
+    with open(report_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file", "output", "removed", "seconds", "peak_rss_mb", "cached", "warnings", "error"],
+                                extrasaction="ignore")
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+
+def print_summary(results, elapsed):
+    latencies = [r["seconds"] for r in results]
+    failures = [r for r in results if r["error"]]
+    print(f"Formatted {len(results) - len(failures)}/{len(results)} CVs in {elapsed:.2f}s "
+          f"({len(results) / elapsed if elapsed else 0.0:.2f} files/sec, "
+          f"{sum(r['cached'] for r in results)} from cache)")
+    print(f"Per-file latency: p50 {percentile(latencies, 50) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.0f} ms")
+    # Workers format one document at a time, so this is the memory a worker needs per CV
+    print(f"Peak worker RSS per file: p50 {percentile([r['peak_rss_mb'] for r in results], 50):.0f} MB, "
+          f"max {max(r['peak_rss_mb'] for r in results):.0f} MB")
+    for failure in failures:
+        print(f"FAILED {failure['file']}: {failure['error']}", file=sys.stderr)
+
+# --- Command line ---
+def run_batch(jobs, output_dir, workers, logo_path=LOGO_PATH, pdf_workers=1,
+              trace_path=None, track_memory=False, profile_dir=None, cache_dir=None, ocr_languages="",
+              ocr_dpi=OCR_DPI):
+    # ocr_languages: Tesseract languages (e.g. "eng+jpn") for scanned PDF pages; empty skips OCR
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    if profile_dir:
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+    assign_output_names(jobs)
+    options = {
+        "logo_path": str(logo_path),
+        "pdf_workers": pdf_workers,
+        "track_memory": track_memory,
+        "profile_dir": str(profile_dir) if profile_dir else "",
+        "cache_dir": str(cache_dir) if cache_dir else "",
+        "ocr_languages": ocr_languages,
+        "ocr_dpi": ocr_dpi,
+    }
+    results = []
+    trace_file = open(trace_path, "w", encoding="utf-8") if trace_path else None
+    runner = PoolRunner(workers, options, str(output_dir))
+
+    def record(result):
+        results.append(result)
+        if trace_file and "trace" in result:
+            # Stage timings as JSON lines, one document per line
+            trace_file.write(json.dumps(result["trace"], ensure_ascii=False) + "\n")
+        status = "ok" if not result["error"] else "FAILED"
+        print(f"[{len(results)}/{len(jobs)}] {status} {result['file']}", flush=True)
+
+    started = time.perf_counter()
+    try:
+        crashed = []
+        for result in runner.run(jobs, workers, crashed):
+            record(result)
+        # A dying worker takes every document in flight with it; each is retried on its own so
+        # only the one that kills its worker again is reported as failed
+        for job in crashed:
+            crashed_again = []
+            for result in runner.run([job], 1, crashed_again):
+                record(result)
+            if crashed_again:
+                record(crashed_result(job))
+    finally:
+        runner.close()
+        if trace_file:
+            trace_file.close()
+        # Partial outputs of documents whose worker died
+        for job in jobs:
+            Path(output_dir, job["output_name"] + ".part").unlink(missing_ok=True)
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda r: r["file"])
+    return results, elapsed
+
+class PoolRunner:
+    # Runs format_one over a process pool with at most `limit` documents submitted at a time, so
+    # when a worker dies only the documents in flight are lost; the pool is then replaced and the
+    # remaining documents carry on in the new one
+    def __init__(self, workers, options, output_dir):
+        self.workers = workers
+        self.options = options
+        self.output_dir = output_dir
+        self.pool = None
+
+    def run(self, jobs, limit, crashed):
+        # Yields the result of each job as it completes; jobs lost to a dead worker go to `crashed`
+        queue = deque(jobs)
+        in_flight = {}
+        while queue or in_flight:
+            while queue and len(in_flight) < limit:
+                if self.pool is None:
+                    self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                    initargs=(self.options,))
+                try:
+                    future = self.pool.submit(format_one, queue[0], self.output_dir)
+                except BrokenProcessPool:
+                    self._replace(self.pool)
+                    continue
+                in_flight[future] = (queue.popleft(), self.pool)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, pool = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    crashed.append(job)
+                    self._replace(pool)
+                    continue
+                yield result
+
+    def _replace(self, pool):
+        # Drops a broken pool; the next submit starts a fresh one
+        if pool is self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Format a directory of CVs into Asahi DOCX files.")
+    parser.add_argument("input", help="Directory of PDF/DOCX files, or a manifest CSV (file, name, age)")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for the Asahi_CV_<initials>.docx files")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--age", type=int, help="Candidate age for every file (directory mode only)")
+    parser.add_argument("--pdf-workers", type=int, default=1,
+                        help="Processes per PDF for page-parallel extraction of long documents")
+    parser.add_argument("--logo", default=LOGO_PATH, help="Logo image for the document header")
+    parser.add_argument("--trace", metavar="FILE", help="Write per-stage timings for every document as JSON lines")
+    parser.add_argument("--track-memory", action="store_true", help="Record peak memory per stage (slower)")
+    parser.add_argument("--profile-dir", metavar="DIR", help="Dump a cProfile .prof file per document")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="Reuse CVs formatted (and pages OCR'd) before from this on-disk cache, and add new ones to it")
+    parser.add_argument("--ocr", action="store_true", help="OCR scanned PDF pages (needs tesseract installed)")
+    parser.add_argument("--ocr-lang", default=OCR_LANGUAGES, help="Tesseract languages for --ocr, e.g. eng+jpn")
+    parser.add_argument("--ocr-dpi", type=int, default=OCR_DPI, help="Resolution scanned pages are rendered at for OCR")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    input_path = Path(args.input)
+    if input_path.is_dir():
+        if args.age is None:
+            build_parser().error("--age is required when formatting a directory without a manifest")
+        jobs = jobs_from_directory(input_path, args.age)
+    else:
+        jobs = jobs_from_manifest(input_path)
+    if args.ocr and not TesseractEngine().available():
+        build_parser().error("--ocr needs the tesseract command installed and on PATH")
+    if not jobs:
+        print("No PDF or DOCX files found.", file=sys.stderr)
+        return 1
+
+    results, elapsed = run_batch(
+        jobs, args.output_dir, max(1, args.workers), args.logo, max(1, args.pdf_workers),
+        trace_path=args.trace, track_memory=args.track_memory, profile_dir=args.profile_dir,
+        cache_dir=args.cache_dir, ocr_languages=args.ocr_lang if args.ocr else "", ocr_dpi=args.ocr_dpi,
+    )
+    write_report(results, Path(args.output_dir) / "batch_report.csv")
+    print_summary(results, elapsed)
+    return 1 if any(r["error"] for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
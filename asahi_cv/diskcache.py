@@ -0,0 +1,226 @@
+# Asahi CV Formatter - Persistent content-addressed cache of formatted CVs
+#
+# A formatted CV is a pure function of the upload bytes, the candidate name and age, the logo,
+# the PII detector and the extraction/generation code. FormatCache stores each result under a
+# SHA-256 of all of them, so the same CV submitted again (after a restart, by another recruiter,
+# from another worker) is served without opening PyMuPDF or python-docx. An entry is a directory:
+#
+#   <cache>/<key[:2]>/<key>/meta.json       word count, removal count, warnings, output name
+#                           extracted.txt   text as extracted from the upload
+#                           cleaned.txt     text after PII removal
+#                           output.docx     the formatted document
+#
+# Entries are built in a private temporary directory and renamed into place in one step, so
+# concurrent workers never see half-written entries (when two build the same entry the first
+# rename wins). A hit holds output.docx open, so an entry evicted while it is served is still
+# read in full. A hit touches the entry's mtime, and once the cache grows past max_bytes the
+# least recently used entries are removed.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from .document import LOGO_PATH
+from .pii import PIIDetector
+from .spool import COPY_CHUNK_BYTES
+
+DISK_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Bump when the entry layout changes
+CACHE_FORMAT_VERSION = 1
+# Eviction trims the cache to this fraction of max_bytes so it doesn't run on every store
+EVICT_TO_FRACTION = 0.9
+# Temporary directories older than this are left over from crashed workers
+STALE_TEMP_SECONDS = 60 * 60
+
+# Code and libraries whose version changes what an upload formats to
+_CODE_FILES = ("extract.py", "document.py", "pipeline.py", "ocr.py")
+_LIBRARIES = ("PyMuPDF", "python-docx", "lxml")
+
+def upload_digest(file):
+    # SHA-256 hex digest of a path, bytes or binary file object (read in chunks, then rewound)
+    digest = hashlib.sha256()
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        digest.update(file)
+    elif isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(COPY_CHUNK_BYTES), b""):
+                digest.update(chunk)
+    else:
+        position = file.tell()
+        for chunk in iter(lambda: file.read(COPY_CHUNK_BYTES), b""):
+            digest.update(chunk)
+        file.seek(position)
+    return digest.hexdigest()
+
+def _library_version(name):
+    # Imported here: importlib.metadata pulls in email and more, too much for every import of pipeline
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return ""
+
+class CacheEntry:
+    # docx_file: output.docx, opened by FormatCache.get() and closed once it has been read
+    def __init__(self, path, meta, docx_file):
+        self.path = path
+        self.meta = meta
+        self.docx_file = docx_file
+
+    def read_docx(self):
+        with self.docx_file as f:
+            return f.read()
+
+    def copy_docx_to(self, output):
+        with self.docx_file as f:
+            shutil.copyfileobj(f, output, COPY_CHUNK_BYTES)
+
+    def read_text(self, name):
+        # name: 'extracted' or 'cleaned'
+        return (self.path / f"{name}.txt").read_text(encoding="utf-8", errors="surrogatepass")
+
+class CacheWriter:
+    # An entry being built in a temporary directory; nothing is visible until commit(). Storing
+    # is best effort: after an OSError (e.g. a full disk) the writer drops the entry and every
+    # later call does nothing.
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        try:
+            self.path = Path(tempfile.mkdtemp(prefix=".tmp-", dir=cache.directory))
+        except OSError:
+            self.path = None
+
+    @property
+    def closed(self):
+        # Committed, aborted or failed
+        return self.path is None
+
+    def _write(self, action):
+        try:
+            action()
+        except OSError:
+            self.abort()
+
+    def write_text(self, name, text):
+        if not self.closed:
+            self._write(lambda: (self.path / f"{name}.txt").write_text(text, encoding="utf-8", errors="surrogatepass"))
+
+    def write_docx(self, source):
+        # source: the .docx bytes or a binary file object positioned at its start
+        def write():
+            with open(self.path / "output.docx", "wb") as f:
+                if isinstance(source, bytes):
+                    f.write(source)
+                else:
+                    shutil.copyfileobj(source, f, COPY_CHUNK_BYTES)
+        if not self.closed:
+            self._write(write)
+
+    def commit(self, meta):
+        if self.closed:
+            return
+        try:
+            (self.path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+            size = sum(f.stat().st_size for f in self.path.iterdir())
+            final_path = self.cache.entry_path(self.key)
+            final_path.parent.mkdir(exist_ok=True)
+            # Fails if another worker stored the same entry first
+            os.rename(self.path, final_path)
+        except OSError:
+            self.abort()
+            return
+        self.path = None
+        self.cache.added(size)
+
+    def abort(self):
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+class FormatCache:
+    def __init__(self, directory, max_bytes=DISK_CACHE_MAX_BYTES, logo_path=LOGO_PATH, pii_detector=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        # Everything besides the upload, name and age that the output depends on
+        self.version = self._version_digest(logo_path, pii_detector or PIIDetector())
+        # Bytes in the cache as of the last scan plus this process's stores since
+        self._size = None
+
+    @staticmethod
+    def _version_digest(logo_path, pii_detector):
+        digest = hashlib.sha256(f"format {CACHE_FORMAT_VERSION}\n".encode())
+        digest.update(upload_digest(logo_path).encode() + b"\n")
+        digest.update(pii_detector.fingerprint().encode() + b"\n")
+        package_dir = Path(__file__).parent
+        for file_name in _CODE_FILES:
+            digest.update(upload_digest(package_dir / file_name).encode() + b"\n")
+        for library in _LIBRARIES:
+            digest.update(f"{library} {_library_version(library)}\n".encode())
+        return digest.hexdigest()
+
+    def key(self, input_digest, candidate_name, age, variant=""):
+        # variant: per-request options that change the output, e.g. the OCR engine and DPI
+        payload = json.dumps([input_digest, candidate_name, int(age), variant, self.version], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def entry_path(self, key):
+        return self.directory / key[:2] / key
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+            os.utime(path)
+            # Opened here so an evict() in another worker after the lookup can't turn the hit into
+            # a failed read: the open file outlives the entry's removal
+            docx_file = open(path / "output.docx", "rb")
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(path, meta, docx_file)
+
+    def writer(self, key):
+        return CacheWriter(self, key)
+
+    def added(self, size):
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # Removes least recently used entries until the cache is under EVICT_TO_FRACTION of
+        # max_bytes; entries are renamed out of the way first so readers never see half of one
+        entries = []
+        now = time.time()
+        for path in self.directory.glob("??/*"):
+            try:
+                size = sum(f.stat().st_size for f in path.iterdir())
+                entries.append((path.stat().st_mtime, size, path))
+            except OSError:
+                continue
+        for path in self.directory.glob(".tmp-*"):
+            try:
+                if now - path.stat().st_mtime > STALE_TEMP_SECONDS:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes * EVICT_TO_FRACTION:
+                    break
+                doomed = self.directory / f".tmp-evict-{os.getpid()}-{path.name}"
+                try:
+                    os.rename(path, doomed)
+                except OSError:
+                    continue
+                shutil.rmtree(doomed, ignore_errors=True)
+                total -= size
+        self._size = total
@@ -0,0 +1,186 @@
+# Asahi CV Formatter - Asahi-branded DOCX generation
+#
+# python-docx and Pillow are imported on first use, so importing this module is cheap.
+import copy
+import os
+import re
+from functools import lru_cache
+from io import BytesIO
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "asahi_logo-04.jpg")
+
+# Image formats python-docx can embed without converting them first
+EMBEDDABLE_IMAGE_FORMATS = {"JPEG", "PNG", "GIF", "BMP", "TIFF"}
+
+# --- File Naming ---
+def abbreviate_name_age(full_name, age):
+    try:
+        name_parts = [part.strip() for part in full_name.strip().split() if part.strip()]
+        if not name_parts:
+            return f"N.A.{age}yrs"
+        initials = ''.join([part[0].upper() + '.' for part in name_parts])
+        return f"{initials} {age}yrs"
+    except Exception:
+        return f"N.A.{age}yrs"
+
+def output_file_name(full_name, age):
+    abbreviation = abbreviate_name_age(full_name, age).replace(f" {age}yrs", "")
+    return f"Asahi_CV_{abbreviation}.docx"
+
+# --- Logo Asset ---
+class LogoAsset:
+    # Ready-to-embed logo bytes, decoded once per process and shared by every document
+    def __init__(self, data, image_format):
+        self.data = data
+        self.format = image_format
+    
+    @classmethod
+    def from_image(cls, img):
+        image_stream = BytesIO()
+        img.save(image_stream, format='PNG')
+        return cls(image_stream.getvalue(), "PNG")
+    
+    def stream(self):
+        # BytesIO shares the underlying bytes until written to, so this doesn't copy the image
+        return BytesIO(self.data)
+
+@lru_cache(maxsize=4)
+def load_logo_asset(path=LOGO_PATH):
+    from PIL import Image
+    with open(path, "rb") as f:
+        data = f.read()
+    with Image.open(BytesIO(data)) as img:
+        if img.format in EMBEDDABLE_IMAGE_FORMATS:
+            # Embed the original file (e.g. the JPEG logo) rather than re-encoding it as PNG
+            return LogoAsset(data, img.format)
+        return LogoAsset.from_image(img)
+
+def add_header_with_logo(doc, logo):
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches
+    
+    if not isinstance(logo, LogoAsset):
+        logo = LogoAsset.from_image(logo)
+    
+    section = doc.sections[0]
+    header = section.header
+    
+    for paragraph in header.paragraphs:
+        paragraph.clear()
+    
+    logo_para = header.add_paragraph()
+    logo_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    
+    tab_stops = logo_para.paragraph_format.tab_stops
+    tab_stops.add_tab_stop(Inches(6.5), WD_ALIGN_PARAGRAPH.RIGHT)
+    
+    logo_run = logo_para.add_run("\t")
+    logo_run.add_picture(logo.stream(), width=Inches(2.634), height=Inches(0.508))
+    
+    section.header_distance = Inches(0.4)
+
+# --- Document Template ---
+class DocumentTemplate:
+    # Branded skeleton (margins, header with logo, Normal style) built once per logo.
+    # Candidates only ever add paragraphs to the main document part, so new_document()
+    # deep-copies that part and shares the styles, header, image and other parts as-is.
+    def __init__(self, logo):
+        from docx import Document
+        from docx.shared import Inches, Pt
+        
+        doc = Document()
+        
+        sections = doc.sections
+        for section in sections:
+            section.top_margin = Inches(1.2)
+            section.bottom_margin = Inches(0.8)
+            section.left_margin = Inches(0.8)
+            section.right_margin = Inches(0.8)
+        
+        add_header_with_logo(doc, logo)
+        
+        style = doc.styles['Normal']
+        font = style.font
+        font.name = 'Calibri'
+        font.size = Pt(11)
+        
+        self._skeleton = doc
+        self._shared_parts = [part for part in doc.part.package.iter_parts() if part is not doc.part]
+    
+    def new_document(self):
+        # Seeding the deepcopy memo with the shared parts makes copy return them untouched
+        memo = {id(part): part for part in self._shared_parts}
+        return copy.deepcopy(self._skeleton, memo)
+
+# --- Bulk Body Writer ---
+# Characters lxml refuses in text; documents containing them go through add_paragraph so
+# they fail exactly as before
+XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+RUN_BREAK_CHARS = re.compile(r'([\t\r\n])')
+
+def _escape(text):
+    # xml.sax.saxutils.escape without importing it (it pulls in urllib at import time)
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def _run_content_xml(text):
+    # Same run content python-docx writes for Run.text: tabs become <w:tab/>, line breaks
+    # <w:br/>, and text with outer whitespace gets xml:space="preserve"
+    xml = []
+    for segment in RUN_BREAK_CHARS.split(text) if ('\t' in text or '\r' in text) else (text,):
+        if segment == '\t':
+            xml.append('<w:tab/>')
+        elif segment in ('\r', '\n'):
+            xml.append('<w:br/>')
+        elif segment:
+            space = ' xml:space="preserve"' if len(segment.strip()) < len(segment) else ''
+            xml.append(f'<w:t{space}>{_escape(segment)}</w:t>')
+    return ''.join(xml)
+
+def add_body_paragraphs(doc, lines):
+    # Equivalent to doc.add_paragraph(line) for each line, but the <w:p> elements are
+    # parsed as one fragment and inserted before the section properties in one operation
+    if not lines:
+        return
+    from docx.oxml import parse_xml
+    from docx.oxml.ns import nsdecls
+    if any(XML_ILLEGAL_CHARS.search(line) for line in lines):
+        for line in lines:
+            doc.add_paragraph(line)
+        return
+    fragment = parse_xml(
+        f'<w:body {nsdecls("w")}>'
+        + ''.join(f'<w:p><w:r>{_run_content_xml(line)}</w:r></w:p>' for line in lines)
+        + '</w:body>'
+    )
+    body = doc.element.body
+    sect_pr = body.sectPr
+    index = body.index(sect_pr) if sect_pr is not None else len(body)
+    body[index:index] = list(fragment)
+
+@lru_cache(maxsize=4)
+def get_document_template(logo):
+    return DocumentTemplate(logo)
+
+def generate_asahi_cv(cleaned_text, logo, candidate_name, age):
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+    
+    if not isinstance(logo, LogoAsset):
+        logo = LogoAsset.from_image(logo)
+    doc = get_document_template(logo).new_document()
+    
+    name_paragraph = doc.add_paragraph()
+    name_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    name_paragraph.paragraph_format.space_after = Pt(24)
+    
+    name_run = name_paragraph.add_run(abbreviate_name_age(candidate_name, age))
+    name_run.font.name = 'ＭＳ 明朝'
+    name_run.font.size = Pt(16)
+    name_run.font.bold = True
+    
+    doc.add_paragraph()
+    
+    content_lines = [line for line in (raw_line.strip() for raw_line in cleaned_text.split("\n")) if line]
+    add_body_paragraphs(doc, content_lines)
+    
+    return doc
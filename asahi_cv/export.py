@@ -0,0 +1,89 @@
+# Asahi CV Formatter - Shortlist export: many CVs into one ZIP
+#
+# Formats a list of uploads across a process pool and writes each .docx into the archive as
+# soon as its worker finishes, so only the documents in flight are held in memory. Output names
+# come from batch.assign_output_names: repeated initials are numbered in input order
+# (Asahi_CV_J.S..docx, Asahi_CV_J.S._2.docx, ...), so a shortlist always gets the same names
+# whatever order the documents complete in.
+#
+#   results = export_zip(jobs, "shortlist.zip", workers=4)
+#
+# Each job is a dict with: file (bytes or a path), file_name, name, age.
+import zipfile
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from .batch import assign_output_names
+from .document import LOGO_PATH
+from .ocr import OCR_DPI
+from .workers import format_upload, worker_pool
+
+def _failed(job, error):
+    # Result for a job that never produced a FormatResult; crashed marks a dead worker process,
+    # after which a shared pool has to be replaced
+    return {"file": job["file_name"], "output": "", "removed": 0, "warnings": "",
+            "error": f"{type(error).__name__}: {error}", "crashed": isinstance(error, BrokenProcessPool)}
+
+# --- Export ---
+def export_zip(jobs, output, workers=1, logo_path=LOGO_PATH, on_result=None, ocr_languages="", ocr_dpi=OCR_DPI,
+               pool=None):
+    # Writes the archive to `output` (a path or binary file object) and returns one result dict
+    # per job, in input order, with "crashed" set when a worker process died on it.
+    # on_result(done, total, result) is called as each document lands.
+    # With ocr_languages (Tesseract languages) scanned PDF pages are OCR'd.
+    # pool: a running workers.worker_pool() to format in instead of starting one; its own logo
+    # and OCR settings apply, and ocr_languages only turns OCR on or off.
+    assign_output_names(jobs)
+    results = [None] * len(jobs)
+    own_pool = pool is None
+    if own_pool:
+        pool = worker_pool(max(1, min(workers, len(jobs))),
+                           {"logo_path": str(logo_path), "ocr_languages": ocr_languages, "ocr_dpi": ocr_dpi})
+    futures = {}
+    try:
+        # .docx files are already deflated, so they are stored rather than compressed again
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+            done = 0
+            for index, job in enumerate(jobs):
+                try:
+                    future = pool.submit(format_upload, job["file"], job["file_name"], job["name"], job["age"],
+                                         use_ocr=bool(ocr_languages))
+                except Exception as e:
+                    # e.g. BrokenProcessPool: a shared pool whose worker died before this export
+                    done += 1
+                    results[index] = _failed(job, e)
+                    if on_result:
+                        on_result(done, len(jobs), results[index])
+                    continue
+                futures[future] = index
+            for future in as_completed(futures):
+                # Popping the future drops the last reference to its .docx once it is written
+                index = futures.pop(future)
+                job = jobs[index]
+                done += 1
+                try:
+                    formatted = future.result()
+                except Exception as e:
+                    results[index] = _failed(job, e)
+                    if on_result:
+                        on_result(done, len(jobs), results[index])
+                    continue
+                result = {"file": job["file_name"], "output": "", "removed": 0,
+                          "warnings": " ".join(formatted.warnings), "error": formatted.error, "crashed": False}
+                if formatted.ok:
+                    with archive.open(job["output_name"], "w") as member:
+                        member.write(formatted.docx)
+                    result["output"] = job["output_name"]
+                    result["removed"] = formatted.removal_count
+                del formatted
+                results[index] = result
+                if on_result:
+                    on_result(done, len(jobs), result)
+    finally:
+        if own_pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+        else:
+            # A shared pool keeps running; only this export's queued jobs are dropped
+            for future in futures:
+                future.cancel()
+    return results
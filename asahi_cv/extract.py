@@ -0,0 +1,202 @@
+# Asahi CV Formatter - Text extraction from PDF and DOCX uploads
+#
+# PyMuPDF and lxml are imported on first use, so importing this module is cheap.
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import repeat
+
+from .spool import SPOOL_MAX_BYTES, file_path, upload_size
+
+# Extraction budgets so one huge upload can't stall the server; hitting one returns the
+# pages read so far with a warning
+PDF_MAX_PAGES = 200
+PDF_MAX_TEXT_BYTES = 5 * 1024 * 1024
+# With workers > 1, PDFs of at least this many pages are split across worker processes
+PDF_PARALLEL_MIN_PAGES = 40
+
+@dataclass
+class ExtractionResult:
+    text: str = ""
+    warnings: list = field(default_factory=list)
+    error: str = ""
+
+    @property
+    def ok(self):
+        return not self.error
+
+# --- PDF ---
+@contextmanager
+def _pdf_source(file, spool_bytes=SPOOL_MAX_BYTES):
+    # Paths are opened lazily by PyMuPDF (and cheaply re-opened by workers). Uploads up to
+    # spool_bytes are read into memory once; larger ones are copied to a temporary file and
+    # opened by path, so neither this process nor the page workers hold the whole PDF.
+    if isinstance(file, (str, os.PathLike)):
+        yield os.fspath(file)
+    elif upload_size(file) <= spool_bytes:
+        yield bytes(file) if isinstance(file, (bytes, bytearray)) else file.read()
+    else:
+        with file_path(file, suffix=".pdf") as path:
+            yield path
+
+def _open_pdf(source):
+    import fitz  # PyMuPDF
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source, filetype="pdf")
+
+def iter_pdf_page_texts(doc, start, stop):
+    for page_number in range(start, stop):
+        yield doc[page_number].get_text()
+
+def _extract_page_range(source, start, stop):
+    with _open_pdf(source) as doc:
+        return list(iter_pdf_page_texts(doc, start, stop))
+
+def iter_pdf_page_texts_parallel(source, stop, workers):
+    # Contiguous page ranges, one per worker, each worker opening its own copy of the document.
+    # Workers are spawned rather than forked so this is safe inside a threaded server.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    chunk = -(-stop // workers)
+    starts = range(0, stop, chunk)
+    stops = [min(start + chunk, stop) for start in starts]
+    pool = ProcessPoolExecutor(max_workers=len(starts), mp_context=multiprocessing.get_context("spawn"))
+    try:
+        for page_texts in pool.map(_extract_page_range, repeat(source), starts, stops):
+            yield from page_texts
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def extract_text_from_pdf(file, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_TEXT_BYTES, workers=1,
+                          spool_bytes=SPOOL_MAX_BYTES, ocr=None):
+    # ocr: an ocr.PageOCR to recognise pages that have no text layer (scans); None skips them
+    page_texts = []
+    result = ExtractionResult()
+    try:
+        with _pdf_source(file, spool_bytes) as source, _open_pdf(source) as doc:
+            page_count = doc.page_count
+            stop = min(page_count, max_pages)
+            if workers > 1 and stop >= PDF_PARALLEL_MIN_PAGES:
+                pages = iter_pdf_page_texts_parallel(source, stop, workers)
+            else:
+                pages = iter_pdf_page_texts(doc, 0, stop)
+
+            text_bytes = 0
+            for page_text in pages:
+                text_bytes += len(page_text.encode("utf-8"))
+                if text_bytes > max_bytes:
+                    result.warnings.append(f"Large PDF: only the first {len(page_texts)} of {page_count} pages were read (text size limit).")
+                    pages.close()
+                    break
+                page_texts.append(page_text)
+            if not result.warnings and page_count > max_pages:
+                result.warnings.append(f"Large PDF: only the first {max_pages} of {page_count} pages were read (page limit).")
+            if ocr is not None:
+                _ocr_missing_pages(doc, page_texts, ocr, result)
+    except Exception as e:
+        result.error = f"Error reading PDF: {str(e)}"
+        return result
+    result.text = "".join(page_texts)
+    return result
+
+def _ocr_missing_pages(doc, page_texts, ocr, result):
+    from .ocr import OCRError
+    missing = ocr.pages_without_text(doc, page_texts)
+    if not missing:
+        return
+    try:
+        recognized = ocr.recognize(doc, missing)
+    except OCRError as e:
+        # The text layer is still usable; report the scanned pages as unread
+        result.warnings.append(f"{len(missing)} scanned page(s) could not be read: {e}")
+        return
+    for page_number, text in recognized.items():
+        page_texts[page_number] = text
+    result.warnings.append(f"Scanned PDF: text was recognised (OCR) on {len(missing)} of {len(page_texts)} pages.")
+
+# --- DOCX ---
+# The body is streamed from word/document.xml with lxml.etree.iterparse instead of loading the
+# package with python-docx: media and other parts are never read, and each paragraph is freed
+# once its text is taken, so memory stays flat however large the embedded images are. Every
+# paragraph is one line, in document order: body paragraphs, table cells (row by row), content
+# controls and text boxes.
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+_PACKAGE_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+_DOCX_TAGS = (_W + "p", _W + "t", _W + "tab", _W + "ptab", _W + "br", _W + "cr", _W + "noBreakHyphen", _MC_FALLBACK)
+_DELETED_RUN_PARENTS = (_W + "del", _W + "moveFrom")
+# Characters for run content other than w:t, as python-docx renders them (page and column
+# breaks render as nothing)
+_RUN_CHARS = {_W + "tab": "\t", _W + "ptab": "\t", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
+
+def _main_document_part(archive):
+    # The main part is named in _rels/.rels; Word always calls it word/document.xml
+    from lxml import etree
+    try:
+        rels = etree.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in rels.iter(_PACKAGE_RELS):
+        if rel.get("Type") == _OFFICE_DOCUMENT_REL:
+            return rel.get("Target").lstrip("/")
+    return "word/document.xml"
+
+def _drop_finished(paragraph):
+    # Frees a finished paragraph and everything parsed before it (earlier paragraphs, rows,
+    # cells and their properties) at every level up to the root
+    paragraph.clear()
+    node = paragraph
+    while node.getparent() is not None:
+        parent = node.getparent()
+        while node.getprevious() is not None:
+            del parent[0]
+        node = parent
+
+def iter_docx_paragraphs(file):
+    # Yields the text of every paragraph in document order
+    import zipfile
+    from lxml import etree
+    with zipfile.ZipFile(file) as archive, archive.open(_main_document_part(archive)) as part:
+        # Text boxes nest paragraphs inside a paragraph, so open paragraphs form a stack
+        paragraphs = []
+        # Inside mc:Fallback: a copy of the mc:Choice content (e.g. a text box again as VML)
+        fallback_depth = 0
+        for event, elem in etree.iterparse(part, events=("start", "end"), tag=_DOCX_TAGS,
+                                           resolve_entities=False, no_network=True):
+            tag = elem.tag
+            if tag == _MC_FALLBACK:
+                fallback_depth += 1 if event == "start" else -1
+            elif fallback_depth:
+                continue
+            elif tag == _W + "p":
+                if event == "start":
+                    paragraphs.append([])
+                    continue
+                yield "".join(paragraphs.pop())
+                if not paragraphs:
+                    _drop_finished(elem)
+            # Run content only (w:tab also defines tab stops in paragraph properties), and not
+            # in runs that are tracked deletions
+            elif (event == "end" and paragraphs and elem.getparent().tag == _W + "r"
+                  and elem.getparent().getparent().tag not in _DELETED_RUN_PARENTS):
+                if tag == _W + "t":
+                    paragraphs[-1].append(elem.text or "")
+                elif tag == _W + "br":
+                    if elem.get(_W + "type", "textWrapping") == "textWrapping":
+                        paragraphs[-1].append("\n")
+                else:
+                    paragraphs[-1].append(_RUN_CHARS[tag])
+
+def extract_text_from_docx(file):
+    try:
+        return ExtractionResult(text="\n".join(iter_docx_paragraphs(file)))
+    except Exception as e:
+        return ExtractionResult(error=f"Error reading DOCX: {str(e)}")
+
+def extract_text(file, file_name, pdf_workers=1, ocr=None):
+    if file_name.lower().endswith(".pdf"):
+        return extract_text_from_pdf(file, workers=pdf_workers, ocr=ocr)
+    return extract_text_from_docx(file)
@@ -0,0 +1,169 @@
+# Asahi CV Formatter - Incremental PII cleaning for re-uploaded CVs
+#
+# A recruiter who fixes a typo in the source DOCX and uploads it again changes a few lines;
+# IncrementalCleaner only re-detects and re-filters the parts of the text it hasn't seen.
+#
+# The text is cut into segments at newlines no PII match can cross (see split_segments), so
+# cleaning segment by segment gives exactly what clean_text gives for the whole document.
+# Detection results are cached per segment content hash. Cleaned segments are cached per hash
+# under a fingerprint of the document-wide detected items and names; when an edit changes that
+# fingerprint every segment is filtered again (detection results stay valid).
+import hashlib
+from bisect import bisect_right
+from collections import OrderedDict
+
+from .instrument import PipelineTrace
+from .pii import PIIDetector, findall_value, join_for_batch, line_scanner_items, name_removal_set
+
+# Per-cleaner cap on cached segments, least recently used evicted first
+MAX_CACHED_SEGMENTS = 50_000
+
+def _segment_key(segment):
+    return hashlib.blake2b(segment.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+def split_segments(text):
+    # Name matches run across newlines (\s+ between capitalised words, 'Name:\nJohn Smith'), but
+    # only through whitespace, letters and the label colon. A newline is a safe cut unless the
+    # last non-space character before it is a letter or ':' and the first one after it a letter;
+    # every other detector pattern stays within a line.
+    lines = text.split("\n")
+    following = [""] * len(lines)
+    next_char = ""
+    for index in range(len(lines) - 1, -1, -1):
+        stripped = lines[index].lstrip()
+        if stripped:
+            next_char = stripped[0]
+        following[index] = next_char
+
+    segments = []
+    start = 0
+    previous_char = ""
+    for index, line in enumerate(lines):
+        if index and not ((previous_char.isalpha() or previous_char == ":") and following[index].isalpha()):
+            segments.append("\n".join(lines[start:index]))
+            start = index
+        stripped = line.rstrip()
+        if stripped:
+            previous_char = stripped[-1]
+    segments.append("\n".join(lines[start:]))
+    return segments
+
+class SegmentDetection:
+    __slots__ = ("items", "names")
+
+    def __init__(self):
+        # PII type -> set of matches, including 'personal_info_lines'
+        self.items = {}
+        self.names = set()
+
+    def add(self, pii_type, value):
+        self.items.setdefault(pii_type, set()).add(value)
+
+class IncrementalCleaner:
+    def __init__(self, pii_detector=None, max_segments=MAX_CACHED_SEGMENTS):
+        self.pii_detector = pii_detector or PIIDetector()
+        self.max_segments = max_segments
+        self._detections = OrderedDict()
+        self._cleaned = {}
+        self._fingerprint = None
+        self._name_pattern = None
+        self._scanner = None
+        # Segment counts of the last clean() call, for diagnostics
+        self.last_run = {}
+
+    def clean(self, raw_text, trace=None):
+        # Same result as pipeline.clean_text(raw_text, pii_detector)
+        trace = trace or PipelineTrace()
+        segments = split_segments(raw_text)
+        keys = [_segment_key(segment) for segment in segments]
+
+        with trace.stage("detect_pii_incremental") as record:
+            unseen = {key: segment for key, segment in zip(keys, segments) if key not in self._detections}
+            for key, detection in zip(unseen, self._detect_segments(list(unseen.values()))):
+                self._detections[key] = detection
+            detected_pii, detected_names = self._merge(keys, raw_text)
+            record.lines = sum(segment.count("\n") + 1 for segment in unseen.values())
+
+        fingerprint = self._fingerprint_of(detected_pii, detected_names)
+        full_rescan = fingerprint != self._fingerprint
+        if full_rescan:
+            self._fingerprint = fingerprint
+            self._cleaned.clear()
+            self._name_pattern = self.pii_detector.build_name_pattern(detected_names)
+            self._scanner = self.pii_detector.build_line_scanner(detected_pii)
+
+        with trace.stage("remove_pii_incremental") as record:
+            filtered_lines = []
+            removed_names = set()
+            removed_lines = 0
+            refiltered = 0
+            for key, segment in zip(keys, segments):
+                cleaned = self._cleaned.get(key)
+                if cleaned is None:
+                    cleaned = self.pii_detector.filter_lines(segment, self._name_pattern, self._scanner)
+                    self._cleaned[key] = cleaned
+                    refiltered += 1
+                    record.lines += segment.count("\n") + 1
+                filtered_lines.extend(cleaned[0])
+                removed_names |= cleaned[1]
+                removed_lines += cleaned[2]
+        self._evict()
+
+        self.last_run = {"segments": len(segments), "detected": len(unseen), "refiltered": refiltered,
+                         "full_rescan": full_rescan}
+        # Blank lines are never kept, so remove_pii's blank-line collapsing has nothing to do
+        return "\n".join(filtered_lines).strip(), len(removed_names) + removed_lines
+
+    def _detect_segments(self, segments):
+        # detect_all_pii and detect_names for many segments in one regex pass per pattern
+        detections = [SegmentDetection() for _ in segments]
+        if not segments:
+            return detections
+        detector = self.pii_detector
+        # Unseen segments are joined into one buffer, as in PIIDetector.detect_all_pii_batch
+        buffer, offsets = join_for_batch(segments)
+
+        for pii_type, pattern in detector.patterns.items():
+            if pii_type in detector.DOCUMENT_PATTERNS:
+                continue
+            for match in pattern.finditer(buffer):
+                detections[bisect_right(offsets, match.start()) - 1].add(pii_type, findall_value(match))
+        for pattern in detector.NAME_PATTERNS:
+            for match in pattern.finditer(buffer):
+                name = detector.filter_name(match.group(1))
+                if name is not None:
+                    detections[bisect_right(offsets, match.start()) - 1].names.add(name)
+        for detection, lines in zip(detections, detector.personal_info_lines_batch(buffer, offsets)):
+            for line in lines:
+                detection.add("personal_info_lines", line)
+        return detections
+
+    def _merge(self, keys, raw_text):
+        detected_pii = {}
+        detected_names = set()
+        for key in keys:
+            detection = self._detections[key]
+            self._detections.move_to_end(key)
+            for pii_type, values in detection.items.items():
+                detected_pii.setdefault(pii_type, set()).update(values)
+            detected_names |= detection.names
+        for pii_type in self.pii_detector.DOCUMENT_PATTERNS:
+            matches = self.pii_detector.patterns[pii_type].findall(raw_text)
+            if matches:
+                detected_pii.setdefault(pii_type, set()).update(matches)
+        return detected_pii, detected_names
+
+    def _fingerprint_of(self, detected_pii, detected_names):
+        digest = hashlib.blake2b(digest_size=16)
+        for value in sorted(line_scanner_items(detected_pii)):
+            digest.update(value.encode("utf-8", "surrogatepass") + b"\x00")
+        digest.update(b"\x01")
+        for name in sorted(name_removal_set(detected_names)):
+            digest.update(name.encode("utf-8", "surrogatepass") + b"\x00")
+        return digest.digest()
+
+    def _evict(self):
+        while len(self._detections) > self.max_segments:
+            self._detections.popitem(last=False)
+        if len(self._cleaned) > self.max_segments:
+            self._cleaned.clear()
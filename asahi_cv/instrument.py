@@ -0,0 +1,85 @@
+# Asahi CV Formatter - Stage timing and profiling instrumentation
+#
+# A PipelineTrace records, for each pipeline stage, wall time, bytes and lines processed and
+# (optionally) peak traced memory. Traces serialise to JSON lines for the batch path; an
+# opt-in cProfile dump captures hot spots for a single document.
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+@dataclass
+class StageRecord:
+    stage: str
+    seconds: float = 0.0
+    bytes: int = 0
+    lines: int = 0
+    # Peak Python allocations above the stage's starting point; None unless memory tracking is on
+    peak_memory: int = None
+
+def measure_input(data):
+    # Bytes and lines of a text or binary payload
+    if isinstance(data, str):
+        return len(data.encode("utf-8", "surrogatepass")), data.count("\n") + 1 if data else 0
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return len(data), 0
+    return 0, 0
+
+class PipelineTrace:
+    def __init__(self, label="", track_memory=False):
+        self.label = label
+        self.track_memory = track_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, data=None):
+        # Yields the StageRecord so callers can fill in sizes only known afterwards
+        record = StageRecord(name, 0.0, *measure_input(data))
+        # tracemalloc is process-wide: only start/stop it when nobody else is tracing, and
+        # expect overlapping stages from other threads to show up in the peak
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            if self.track_memory:
+                record.peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+                if started_tracing:
+                    tracemalloc.stop()
+            self.records.append(record)
+
+    @property
+    def total_seconds(self):
+        return sum(record.seconds for record in self.records)
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "total_seconds": self.total_seconds,
+            "stages": [asdict(record) for record in self.records],
+        }
+
+    def to_json_line(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+@contextmanager
+def profile_to(path):
+    # cProfile the enclosed block and dump pstats-compatible output to `path` (no-op if None)
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
@@ -0,0 +1,243 @@
+# Asahi CV Formatter - OCR fallback for scanned PDF pages
+#
+# Only pages without a text layer are OCR'd: extract_text_from_pdf reads the text layer as
+# usual, and for every page that came back empty but carries an image, PageOCR renders the page
+# at `dpi`, looks its raster up in the page cache and sends the misses to the OCR engine,
+# across a process pool when workers > 1 and there are enough of them. A mixed document pays for
+# OCR only on its scanned pages, and a page seen before (same raster, engine and DPI) is not
+# OCR'd again. With a FormatCache directory the page cache also lives on disk, under
+# <cache_dir>/ocr-pages, so it outlasts the process and is shared by the workers.
+#
+# Engines are picklable callables engine(png_bytes, dpi) -> text with a `name` that identifies
+# their output. TesseractEngine runs a locally installed `tesseract`; StubEngine returns fixed
+# text so the stage can be exercised offline.
+#
+#   ocr = PageOCR(TesseractEngine(languages="eng+jpn"), dpi=300, workers=2)
+#   extraction = extract_text(upload, "scan.pdf", ocr=ocr)
+import hashlib
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+OCR_DPI = 300
+OCR_LANGUAGES = "eng"
+OCR_TIMEOUT_SECONDS = 120
+# Pages whose text layer has fewer non-space characters than this count as having none
+OCR_MIN_TEXT_CHARS = 1
+# Per-process cap on cached page texts, least recently used evicted first
+OCR_CACHE_MAX_PAGES = 2048
+# Subdirectory of a FormatCache directory that holds the on-disk page cache
+OCR_CACHE_SUBDIR = "ocr-pages"
+# Fewer pages to OCR than this run in the calling process: handing them to the pool saves less
+# than it costs
+OCR_PARALLEL_MIN_PAGES = 3
+
+class OCRError(Exception):
+    pass
+
+# --- Engines ---
+class TesseractEngine:
+    def __init__(self, command="tesseract", languages=OCR_LANGUAGES, timeout=OCR_TIMEOUT_SECONDS):
+        self.command = command
+        self.languages = languages
+        self.timeout = timeout
+
+    @property
+    def name(self):
+        return f"tesseract:{self.languages}"
+
+    def available(self):
+        return shutil.which(self.command) is not None
+
+    def __call__(self, image, dpi):
+        try:
+            completed = subprocess.run(
+                [self.command, "stdin", "stdout", "-l", self.languages, "--dpi", str(dpi)],
+                input=image, capture_output=True, timeout=self.timeout,
+            )
+        except FileNotFoundError:
+            raise OCRError(f"OCR engine '{self.command}' is not installed") from None
+        except subprocess.TimeoutExpired:
+            raise OCRError(f"OCR took longer than {self.timeout}s for one page") from None
+        if completed.returncode != 0:
+            message = completed.stderr.decode("utf-8", "replace").strip().splitlines()
+            raise OCRError(f"OCR failed: {message[-1] if message else completed.returncode}")
+        return completed.stdout.decode("utf-8", "replace")
+
+class StubEngine:
+    # Offline stand-in: returns `text` for every page after `delay` seconds
+    def __init__(self, text="Scanned page text", delay=0.0):
+        self.text = text
+        self.delay = delay
+
+    @property
+    def name(self):
+        return f"stub:{self.text}"
+
+    def available(self):
+        return True
+
+    def __call__(self, image, dpi):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.text
+
+def _recognize(engine, image, dpi):
+    return engine(image, dpi)
+
+# --- Page cache ---
+class PageTextCache:
+    # OCR text per page hash: in memory, and in `directory` (shared by processes) if given
+    def __init__(self, directory=None, max_pages=OCR_CACHE_MAX_PAGES):
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        # The Streamlit server shares one cache across session threads
+        self._lock = threading.Lock()
+
+    def get(self, page_hash):
+        with self._lock:
+            text = self._pages.get(page_hash)
+            if text is not None:
+                self._pages.move_to_end(page_hash)
+                return text
+        if self.directory:
+            try:
+                text = (self.directory / f"{page_hash}.txt").read_text(encoding="utf-8")
+            except OSError:
+                return None
+            self._remember(page_hash, text)
+        return text
+
+    def put(self, page_hash, text):
+        self._remember(page_hash, text)
+        if self.directory:
+            # Written to a temporary file and renamed, so readers never see partial text
+            try:
+                fd, temp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(temp_path, self.directory / f"{page_hash}.txt")
+            except OSError:
+                pass
+
+    def _remember(self, page_hash, text):
+        with self._lock:
+            self._pages[page_hash] = text
+            self._pages.move_to_end(page_hash)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+
+# Shared by every PageOCR in the process that isn't given its own cache
+_default_cache = PageTextCache()
+
+# --- OCR stage ---
+class PageOCR:
+    def __init__(self, engine=None, dpi=OCR_DPI, workers=1, cache=None):
+        self.engine = engine or TesseractEngine()
+        self.dpi = dpi
+        self.workers = workers
+        self.cache = cache or _default_cache
+        # Started on first use and kept for the life of this PageOCR (e.g. a batch worker's)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def fingerprint(self):
+        # Identifies the output: same engine and DPI, same text
+        return f"{self.engine.name}@{self.dpi}"
+
+    def pages_without_text(self, doc, page_texts):
+        # Page numbers whose text layer is empty but that show an image (a scan); blank pages
+        # have nothing to recognise
+        return [page_number for page_number, text in enumerate(page_texts)
+                if len("".join(text.split())) < OCR_MIN_TEXT_CHARS and doc[page_number].get_images(full=False)]
+
+    def render(self, page):
+        # Greyscale PNG of the page and the hash identifying its OCR result
+        import fitz  # PyMuPDF
+        pixmap = page.get_pixmap(dpi=self.dpi, colorspace=fitz.csGRAY)
+        digest = hashlib.sha256(self.fingerprint.encode("utf-8"))
+        digest.update(pixmap.samples)
+        return pixmap.tobytes("png"), digest.hexdigest()
+
+    def recognize(self, doc, page_numbers):
+        # {page_number: text} for the given pages; raises OCRError if the engine fails. Pages
+        # are rendered one at a time and at most two per worker wait for OCR, so rasters don't
+        # pile up in memory.
+        texts = {}
+        pending = {}
+        parallel = self.workers > 1 and len(page_numbers) >= OCR_PARALLEL_MIN_PAGES
+        try:
+            for page_number in page_numbers:
+                image, page_hash = self.render(doc[page_number])
+                text = self.cache.get(page_hash)
+                if text is not None:
+                    texts[page_number] = text
+                elif not parallel:
+                    texts[page_number] = self._store(page_hash, self.engine(image, self.dpi))
+                else:
+                    pending[page_number] = (self._submit(image), page_hash)
+                    if len(pending) >= 2 * self.workers:
+                        wait([future for future, _ in pending.values()], return_when=FIRST_COMPLETED)
+                        self._collect(pending, texts, finished_only=True)
+            self._collect(pending, texts)
+        finally:
+            # Pages of a failed document don't hold up the next one
+            for future, _ in pending.values():
+                future.cancel()
+        return texts
+
+    def _submit(self, image):
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned workers, as for page-parallel extraction: safe in a threaded server
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            pool = self._pool
+        try:
+            return pool.submit(_recognize, self.engine, image, self.dpi)
+        except BrokenProcessPool:
+            self._drop_pool(pool)
+            raise OCRError("An OCR worker process died") from None
+
+    def _collect(self, pending, texts, finished_only=False):
+        for page_number, (future, page_hash) in list(pending.items()):
+            if finished_only and not future.done():
+                continue
+            try:
+                text = future.result()
+            except BrokenProcessPool:
+                self._drop_pool(self._pool)
+                raise OCRError("An OCR worker process died") from None
+            texts[page_number] = self._store(page_hash, text)
+            del pending[page_number]
+
+    def _drop_pool(self, pool):
+        # A broken pool is replaced on the next submit
+        with self._pool_lock:
+            if pool is not None and pool is self._pool:
+                self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _store(self, page_hash, text):
+        # Tesseract ends each page with a form feed; page texts end with a newline
+        text = text.replace("\f", "").rstrip() + "\n"
+        self.cache.put(page_hash, text)
+        return text
@@ -0,0 +1,456 @@
+# Asahi CV Formatter - PII detection and removal
+import hashlib
+import re
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+
+# --- Advanced PII Detection Class ---
+class PIIDetector:
+    # Name patterns don't depend on the document, so they are compiled once for every detector
+    NAME_PATTERNS = (
+        # Regular capitalized names (John Doe)
+        re.compile(r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]*)*)\s*$', re.MULTILINE),
+        # Names with labels (first word capped so a label glued to a long letter run can't
+        # rescan it from every label occurrence)
+        re.compile(r'(?:Name|Full Name|Candidate):?\s*([A-Z][a-z]{1,40}(?:\s+[A-Z][a-z]*)+)', re.IGNORECASE),
+        # Names at start of line
+        re.compile(r'^([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)', re.MULTILINE),
+        # ALL CAPS NAMES (NEW PATTERN)
+        re.compile(r'^([A-Z]{2,}(?:\s+[A-Z]{2,})+)\s*$', re.MULTILINE),
+        # Mixed case ALL CAPS names
+        re.compile(r'(?:Name|Full Name|Candidate):?\s*([A-Z]{2,41}(?:\s+[A-Z]{2,})+)', re.IGNORECASE),
+        # ALL CAPS at start of line
+        re.compile(r'^([A-Z]{2,}\s+[A-Z]{2,}(?:\s+[A-Z]{2,})*)', re.MULTILINE),
+    )
+    
+    # Words that mark a capitalised line as an organisation or section heading, not a name
+    NON_NAME_WORDS = frozenset([
+        'university', 'college', 'company', 'corporation', 'inc', 'ltd', 'experience', 'education',
+        'skills', 'objective', 'summary', 'profile', 'references', 'qualifications'
+    ])
+    
+    # Patterns anchored to the whole text rather than to a line ('name' only matches a document
+    # that is nothing but a name)
+    DOCUMENT_PATTERNS = frozenset(['name'])
+    
+    def __init__(self):
+        # Every repeat that can follow another repeat of overlapping characters is bounded, so
+        # each start position does a fixed amount of work and scans stay linear in the text
+        # length (benchmarks/bench_regex_scaling.py checks this on adversarial inputs).
+        # Apart from DOCUMENT_PATTERNS no match spans a newline: an item containing one could
+        # never be found in a single line, and IncrementalCleaner relies on it.
+        self.patterns = {
+            # RFC 5321 limits: 64-character local part, 255-character domain, 63-character label
+            'email': re.compile(r'\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]{1,255}\.[A-Z|a-z]{2,63}\b'),
+            'phone': re.compile(r'(?:\+?1(?:[-.]|[^\S\n])?)?\(?[0-9]{3}\)?(?:[-.]|[^\S\n])?[0-9]{3}(?:[-.]|[^\S\n])?[0-9]{4}|\+\d{1,3}(?:[-.]|[^\S\n])?\d{1,4}(?:[-.]|[^\S\n])?\d{1,4}(?:[-.]|[^\S\n])?\d{1,9}'),
+            # One line at most; the street type must be a whole word
+            'address': re.compile(r'\d{1,6}[ \t][\w \t,.-]{1,80}\b(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|court|ct|place|pl)\b(?:[ \t]{1,5}(?:apt|apartment|unit|#)[ \t]{0,5}\w{1,10})?', re.IGNORECASE),
+            'zip_code': re.compile(r'\b\d{5}(?:-\d{4})?\b'),
+            'height': re.compile(r'\b(?:\d+\'[^\S\n]{0,3}\d+\"|\d+[^\S\n]{0,3}ft[^\S\n]{0,3}\d+[^\S\n]{0,3}in|\d+\.\d+[^\S\n]{0,3}m|\d+[^\S\n]{0,3}cm)\b', re.IGNORECASE),
+            'weight': re.compile(r'\b\d+(?:\.\d+)?[^\S\n]{0,3}(?:lbs?|pounds?|kg|kilograms?)\b', re.IGNORECASE),
+            'date_of_birth': re.compile(r'\b(?:DOB|Date of Birth|Born):?[^\S\n]{0,20}(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}[^\S\n]+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*[^\S\n]+\d{2,4})', re.IGNORECASE),
+            'ssn': re.compile(r'\b\d{3}-\d{2}-\d{4}\b'),
+            'linkedin': re.compile(r'linkedin\.com/in/[\w-]+', re.IGNORECASE),
+	    'name': re.compile(r'^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+$'),
+
+        }
+        
+        self.personal_keywords = [
+            'home address', 'residential address', 'current address', 'permanent address',
+            'contact number', 'mobile number', 'cell phone', 'telephone', 'tel. no', 'phone',
+            'date of birth', 'dob', 'born on', 'age:', 'years old',
+            'marital status', 'married', 'single', 'divorced',
+            'nationality', 'citizen', 'passport', 'visa status',
+            'height:', 'weight:', 'blood type', 'emergency contact',
+            'email address', 'e-mail', 'gmail', 'yahoo','name','full name', '@'
+        ]
+        
+        # Rules identifying lines containing personal information that should be completely removed.
+        # Each rule is a chain of patterns, each searched from where the previous one matched:
+        # the same lines as a single `head.*?tail` pattern, but the tail is searched once
+        # after the first head instead of once per head occurrence.
+        self.pii_line_rules = [
+            _line_rule(r'tel\.?\s*no|phone|mobile|contact', r'[\+\(]?\d{1,4}[\s\-\(\)]{0,8}\d{3,4}[\s\-]{0,8}\d{3,4}'),
+            _line_rule(r'email', r'[a-zA-Z0-9._%+-]@[a-zA-Z0-9.-]{1,255}\.[a-zA-Z]{2}'),
+            _line_rule(r'address|location', r'\d', r'street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd'),
+            _line_rule(r'height|weight|born|dob|date of birth'),
+            _line_rule(r'nationality|citizenship|passport|visa'),
+            _line_rule(r'marital|married|single|divorced'),
+        ]
+        
+        # Every line rule starts with one of these words, so ASCII lines without any of them
+        # can skip the (slower) case-insensitive pattern search
+        self.pii_line_heads = [
+            'tel', 'phone', 'mobile', 'contact', 'email', 'address', 'location',
+            'height', 'weight', 'born', 'dob', 'date of birth',
+            'nationality', 'citizenship', 'passport', 'visa', 'marital', 'married', 'single', 'divorced'
+        ]
+        
+        # Words that mark a keyword line as work-related rather than personal
+        self.work_keywords = [
+            'experience', 'work', 'employment', 'company', 'project', 'skill', 'education', 'university', 'college'
+        ]
+        
+        # Document-independent halves of the line scanner, compiled once per detector
+        self._line_head_re = literal_alternation(self.pii_line_heads)
+        self._keyword_re = literal_alternation(self.personal_keywords)
+        self._work_keyword_re = literal_alternation(self.work_keywords)
+    
+    def filter_name(self, match):
+        # A name pattern match, stripped, or None if it doesn't look like a person's name
+        words = match.split()
+        if not any(word.lower() in self.NON_NAME_WORDS for word in words):
+            # For ALL CAPS, ensure it's at least 2 words and each word is at least 2 characters
+            if match.isupper():
+                if len(words) >= 2 and all(len(word) >= 2 for word in words):
+                    return match.strip()
+            # For regular names, ensure at least 2 words
+            elif len(words) >= 2:
+                return match.strip()
+        return None
+    
+    def detect_names(self, text):
+        detected_names = set()
+        for pattern in self.NAME_PATTERNS:
+            for match in pattern.findall(text):
+                name = self.filter_name(match)
+                if name is not None:
+                    detected_names.add(name)
+        
+        return list(detected_names)
+    
+    def personal_info_lines(self, text):
+        return [text[start:end].strip() for start, end in self._keyword_lines(text)]
+    
+    def _keyword_lines(self, text):
+        # (start, end) of every line that contains a personal keyword, in order
+        if self._keyword_re is None:
+            return
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters lowercase to several ('İ' -> 'i̇'), so offsets in the lowered
+            # text don't line up with the original; check line by line
+            start = 0
+            for line in text.split('\n'):
+                if self._keyword_re.search(line.lower()):
+                    yield start, start + len(line)
+                start += len(line) + 1
+            return
+        position = 0
+        while True:
+            match = self._keyword_re.search(lowered, position)
+            if match is None:
+                return
+            # The whole line is taken once, however many keywords it holds
+            start = lowered.rfind('\n', 0, match.start()) + 1
+            end = lowered.find('\n', match.end())
+            if end == -1:
+                end = len(lowered)
+            yield start, end
+            position = end + 1
+    
+    def detect_all_pii(self, text):
+        detected_pii = defaultdict(list)
+        # Don't include names in the returned PII
+        
+        for pii_type, pattern in self.patterns.items():
+            matches = pattern.findall(text)
+            if matches:
+                detected_pii[pii_type] = list(set(matches))
+        
+        personal_info_lines = self.personal_info_lines(text)
+        if personal_info_lines:
+            detected_pii[PERSONAL_INFO_LINES] = personal_info_lines
+        
+        return dict(detected_pii)
+    
+    def detect_pii_spans(self, text):
+        # detect_all_pii as a PIISpans: offsets into `text` instead of copies of every match
+        # and personal-info line. spans.to_dict() == detect_all_pii(text).
+        spans = PIISpans(text, tuple(self.patterns) + (PERSONAL_INFO_LINES,))
+        line_starts = _line_starts(text)
+        for type_id, pattern in enumerate(self.patterns.values()):
+            # Patterns have at most one group, and findall reports the group when there is one
+            group = 1 if pattern.groups else 0
+            for match in pattern.finditer(text):
+                start, end = match.span(group)
+                # An optional group that didn't take part: findall reports ''
+                start, end = max(start, 0), max(end, 0)
+                spans.add(type_id, start, end, bisect_right(line_starts, start) - 1)
+        info_id = len(self.patterns)
+        for start, end in self._keyword_lines(text):
+            line = text[start:end]
+            # The span covers the stripped line, as personal_info_lines reports it
+            stripped_start = start + len(line) - len(line.lstrip())
+            spans.add(info_id, stripped_start, stripped_start + len(line.strip()),
+                      bisect_right(line_starts, start) - 1)
+        return spans
+    
+    def detect_all_pii_batch(self, texts):
+        # detect_all_pii for many documents: each pattern runs once over all of them joined,
+        # and every match is mapped back to its document by offset. Same dicts as calling
+        # detect_all_pii on each text, without the per-call, per-pattern overhead.
+        texts = list(texts)
+        if not texts:
+            return []
+        buffer, offsets = join_for_batch(texts)
+        found = [defaultdict(list) for _ in texts]
+        for pii_type, pattern in self.patterns.items():
+            if pii_type in self.DOCUMENT_PATTERNS:
+                # Anchored to the whole text, so run per document
+                for matches, text in zip(found, texts):
+                    values = pattern.findall(text)
+                    if values:
+                        matches[pii_type] = values
+                continue
+            for match in pattern.finditer(buffer):
+                found[bisect_right(offsets, match.start()) - 1][pii_type].append(findall_value(match))
+        
+        results = []
+        for matches, info_lines in zip(found, self.personal_info_lines_batch(buffer, offsets)):
+            detected_pii = {pii_type: list(set(matches[pii_type])) for pii_type in self.patterns if pii_type in matches}
+            if info_lines:
+                detected_pii[PERSONAL_INFO_LINES] = info_lines
+            results.append(detected_pii)
+        return results
+    
+    def personal_info_lines_batch(self, buffer, offsets):
+        # personal_info_lines for each text of (buffer, offsets) = join_for_batch(texts), from
+        # one keyword scan over the buffer
+        results = [[] for _ in offsets]
+        for start, end in self._keyword_lines(buffer):
+            results[bisect_right(offsets, start) - 1].append(buffer[start:end].strip())
+        return results
+    
+    def remove_pii(self, text, detected_pii, detected_names=None):
+        # Still detect and remove names internally, but don't show them in PII report
+        # (callers that time detect_names separately pass its result in)
+        if detected_names is None:
+            detected_names = self.detect_names(text)
+        filtered_lines, removed_names, removed_lines = self.filter_lines(
+            text, self.build_name_pattern(detected_names), self.build_line_scanner(detected_pii))
+        removal_count = len(removed_names) + removed_lines
+        
+        cleaned_text = '\n'.join(filtered_lines)
+        
+        # Clean up extra whitespace and empty lines
+        cleaned_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', cleaned_text)
+        cleaned_text = cleaned_text.strip()
+        
+        return cleaned_text, removal_count
+    
+    def build_name_pattern(self, detected_names):
+        # One longest-first alternation removes every name in a single pass
+        names = sorted(name_removal_set(detected_names), key=lambda name: (-len(name), name))
+        if not names:
+            return None
+        return re.compile(r'\b(?:' + '|'.join(re.escape(name) for name in names) + r')\b', re.IGNORECASE)
+    
+    def filter_lines(self, text, name_pattern, scanner):
+        # Removes names, then every line the scanner flags. Returns the kept (stripped, non-empty)
+        # lines, the names removed (lowercased, each counted once however often it appears) and
+        # the number of lines removed.
+        removed_names = set()
+        if name_pattern is not None:
+            def remove_name(match):
+                removed_names.add(match.group(0).lower())
+                return ''
+            
+            text = name_pattern.sub(remove_name, text)
+        
+        # Process line by line to completely remove PII-containing lines
+        filtered_lines = []
+        removed_lines = 0
+        for line in text.split('\n'):
+            if scanner.line_contains_pii(line):
+                removed_lines += 1
+            else:
+                # Only keep lines that don't contain PII
+                original_line = line.strip()
+                if original_line:
+                    filtered_lines.append(original_line)
+        return filtered_lines, removed_names, removed_lines
+    
+    def build_line_scanner(self, detected_pii):
+        # detected_pii: a detect_all_pii dict or a PIISpans
+        if isinstance(detected_pii, PIISpans):
+            items = detected_pii.scanner_items()
+        else:
+            items = line_scanner_items(detected_pii)
+        return PIILineScanner(self._line_head_re, self.pii_line_rules, literal_alternation(items),
+                              self._keyword_re, self._work_keyword_re)
+    
+    def fingerprint(self):
+        # Hash of this detector's rules and of the detection code: cached cleaning results are
+        # only valid for the detector that produced them
+        # open() rather than pathlib, which pulls in urllib at import time
+        with open(__file__, "rb") as f:
+            digest = hashlib.sha256(f.read())
+        state = [
+            sorted((pii_type, pattern.pattern, pattern.flags) for pii_type, pattern in self.patterns.items()),
+            [(pattern.pattern, pattern.flags) for pattern in self.NAME_PATTERNS],
+            [[(pattern.pattern, pattern.flags) for pattern in rule] for rule in self.pii_line_rules],
+            sorted(self.NON_NAME_WORDS), sorted(self.DOCUMENT_PATTERNS),
+            self.personal_keywords, self.pii_line_heads, self.work_keywords,
+        ]
+        digest.update(repr(state).encode("utf-8"))
+        return digest.hexdigest()
+
+# --- Span results ---
+PERSONAL_INFO_LINES = 'personal_info_lines'
+
+def _line_starts(text):
+    # Offset of the first character of every line
+    starts = array('I', [0])
+    position = text.find('\n')
+    while position != -1:
+        starts.append(position + 1)
+        position = text.find('\n', position + 1)
+    return starts
+
+class PIISpans:
+    # Detected PII as spans over the original text: parallel arrays of type id, start, end and
+    # line index, 13 bytes a match instead of a string object (plus list and dict slots) per
+    # value, with the text itself shared rather than copied. to_dict() gives the detect_all_pii
+    # shape; remove_pii and build_line_scanner take either.
+    __slots__ = ('text', 'types', 'type_ids', 'starts', 'ends', 'lines')
+    
+    def __init__(self, text, types):
+        self.text = text
+        # PII type names, indexed by type id
+        self.types = types
+        self.type_ids = array('B')
+        # Unsigned 32-bit offsets: extraction caps a text at a few MB
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+    
+    def add(self, type_id, start, end, line):
+        self.type_ids.append(type_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+    
+    def __len__(self):
+        return len(self.type_ids)
+    
+    def to_dict(self):
+        found = {}
+        for type_id, start, end in zip(self.type_ids, self.starts, self.ends):
+            found.setdefault(type_id, []).append(self.text[start:end])
+        detected_pii = {}
+        for type_id, pii_type in enumerate(self.types):
+            if type_id in found:
+                # Like detect_all_pii: unique matches, but every personal-info line
+                detected_pii[pii_type] = found[type_id] if pii_type == PERSONAL_INFO_LINES else list(set(found[type_id]))
+        return detected_pii
+    
+    def scanner_items(self):
+        # line_scanner_items(self.to_dict()), sliced straight from the offsets
+        items = set()
+        for start, end in zip(self.starts, self.ends):
+            item = self.text[start:end]
+            if len(item.strip()) > 1:
+                items.add(item.lower())
+        return items
+
+# --- Batch detection ---
+# Separates documents joined into one buffer: no pattern outside DOCUMENT_PATTERNS matches
+# '\x00' or crosses the newlines around it, so each match falls inside one document
+BATCH_SEPARATOR = '\n\x00\n'
+
+def join_for_batch(texts):
+    # The joined buffer and the offset each text starts at; the text holding buffer position p
+    # is texts[bisect_right(offsets, p) - 1]
+    offsets = []
+    position = 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text) + len(BATCH_SEPARATOR)
+    return BATCH_SEPARATOR.join(texts), offsets
+
+def findall_value(match):
+    # The value re.findall gives for a match: the whole match, the group, or a tuple of groups
+    groups = match.re.groups
+    if groups == 0:
+        return match.group(0)
+    values = match.groups('')
+    return values[0] if groups == 1 else values
+
+def name_removal_set(detected_names):
+    return {name for name in detected_names if name and len(name.strip()) > 2}
+
+# --- Single-pass PII Line Scanner ---
+def line_scanner_items(detected_pii):
+    # Every detected item longer than one character removes any line it appears in
+    return {str(item).lower() for items in detected_pii.values() for item in items
+            if item and len(str(item).strip()) > 1}
+
+def _line_rule(*patterns):
+    return tuple(re.compile(pattern, re.IGNORECASE) for pattern in patterns)
+
+def _line_rule_matches(line, rule):
+    position = 0
+    for pattern in rule:
+        match = pattern.search(line, position)
+        if match is None:
+            return False
+        position = match.end()
+    return True
+
+def literal_alternation(words):
+    # Compile literal strings into one trie-shaped regex so each position is tested against
+    # a single branch per character instead of every word in turn
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    if not trie:
+        return None
+    try:
+        return re.compile(_trie_pattern(trie))
+    except RecursionError:
+        # Pathologically deep tries fall back to a plain longest-first alternation
+        return re.compile('|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True)))
+
+def _trie_pattern(node):
+    # Single-child chains are emitted flat; only branch points open a group.
+    # A word ending at a node makes the rest of that branch optional.
+    prefix = ''
+    while len(node) == 1 and '' not in node:
+        (char, node), = node.items()
+        prefix += re.escape(char)
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return prefix
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        pattern = '(?:' + pattern + ')?'
+    return prefix + pattern
+
+class PIILineScanner:
+    # Classifies each line of a document with a handful of compiled searches:
+    # line rules, detected items, personal keywords and the work-keyword exemption
+    def __init__(self, line_head_re, line_rules, item_re, keyword_re, work_keyword_re):
+        self.line_head_re = line_head_re
+        self.line_rules = line_rules
+        self.item_re = item_re
+        self.keyword_re = keyword_re
+        self.work_keyword_re = work_keyword_re
+    
+    def line_contains_pii(self, line):
+        line_lower = line.lower()
+        # For ASCII text lower() and IGNORECASE agree, so the head-word prefilter is exact;
+        # anything else goes straight to the rules
+        if not line.isascii() or self.line_head_re.search(line_lower):
+            if any(_line_rule_matches(line, rule) for rule in self.line_rules):
+                return True
+        if self.item_re is not None and self.item_re.search(line_lower):
+            return True
+        # Keyword lines are removed unless they look work-related
+        if self.keyword_re.search(line_lower):
+            return not self.work_keyword_re.search(line_lower)
+        return False
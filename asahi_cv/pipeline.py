@@ -0,0 +1,152 @@
+# Asahi CV Formatter - End-to-end pipeline for one CV
+#
+# extraction -> PII detection/removal -> DOCX generation, with every failure reported in the
+# returned FormatResult instead of raised, so batch and service callers can carry on.
+import shutil
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from .document import LOGO_PATH, generate_asahi_cv, load_logo_asset, output_file_name
+from .extract import extract_text
+from .instrument import PipelineTrace, profile_to
+from .pii import PIIDetector
+from .spool import COPY_CHUNK_BYTES, peak_rss, reset_peak_rss, spooled_file, upload_size
+
+@dataclass
+class FormatResult:
+    file_name: str
+    output_name: str = ""
+    docx: bytes = b""
+    word_count: int = 0
+    removal_count: int = 0
+    warnings: list = field(default_factory=list)
+    error: str = ""
+    trace: PipelineTrace = None
+    # Resident memory high-water mark of the process while formatting (bytes)
+    peak_rss: int = 0
+    # Served from the on-disk cache
+    cached: bool = False
+
+    @property
+    def ok(self):
+        return not self.error
+
+def clean_text(raw_text, pii_detector=None, trace=None):
+    pii_detector = pii_detector or PIIDetector()
+    trace = trace or PipelineTrace()
+    with trace.stage("detect_all_pii", raw_text):
+        # Spans over raw_text rather than a copy of every match
+        detected_pii = pii_detector.detect_pii_spans(raw_text)
+    with trace.stage("detect_names", raw_text):
+        detected_names = pii_detector.detect_names(raw_text)
+    with trace.stage("remove_pii", raw_text):
+        return pii_detector.remove_pii(raw_text, detected_pii, detected_names)
+
+def save_docx(output, cleaned_text, candidate_name, age, logo_path=LOGO_PATH, trace=None):
+    # Writes the .docx to a binary file object (e.g. an open output file or a spooled_file())
+    trace = trace or PipelineTrace()
+    with trace.stage("generate_asahi_cv", cleaned_text):
+        final_doc = generate_asahi_cv(cleaned_text, load_logo_asset(logo_path), candidate_name, age)
+    with trace.stage("save") as record:
+        start = output.tell()
+        final_doc.save(output)
+        record.bytes = output.tell() - start
+    return record.bytes
+
+def render_docx(cleaned_text, candidate_name, age, logo_path=LOGO_PATH, trace=None):
+    buffer = BytesIO()
+    save_docx(buffer, cleaned_text, candidate_name, age, logo_path, trace)
+    return buffer.getvalue()
+
+def _run_pipeline(result, file, file_name, candidate_name, age, logo_path, pii_detector, pdf_workers, ocr, output,
+                  cache_writer):
+    with result.trace.stage("extract") as record:
+        record.bytes = upload_size(file)
+        extraction = extract_text(file, file_name, pdf_workers=pdf_workers, ocr=ocr)
+        record.lines = extraction.text.count("\n") + 1 if extraction.text else 0
+    result.warnings.extend(extraction.warnings)
+    if extraction.error:
+        result.error = extraction.error
+        return
+    if not extraction.text.strip():
+        result.error = "No text could be extracted from the file. Please check the file format."
+        return
+    result.word_count = len(extraction.text.split())
+
+    # The raw text is only needed for cleaning; drop it before the document is built
+    raw_text, extraction = extraction.text, None
+    if cache_writer is not None:
+        cache_writer.write_text("extracted", raw_text)
+    cleaned_text, result.removal_count = clean_text(raw_text, pii_detector, result.trace)
+    del raw_text
+    if cache_writer is not None:
+        cache_writer.write_text("cleaned", cleaned_text)
+
+    if output is None:
+        result.docx = render_docx(cleaned_text, candidate_name, age, logo_path, result.trace)
+        if cache_writer is not None:
+            cache_writer.write_docx(result.docx)
+    elif cache_writer is None:
+        save_docx(output, cleaned_text, candidate_name, age, logo_path, result.trace)
+    else:
+        with spooled_file() as buffer:
+            save_docx(buffer, cleaned_text, candidate_name, age, logo_path, result.trace)
+            buffer.seek(0)
+            cache_writer.write_docx(buffer)
+            buffer.seek(0)
+            shutil.copyfileobj(buffer, output, COPY_CHUNK_BYTES)
+    result.output_name = output_file_name(candidate_name, age)
+
+def _load_cached(result, entry, output):
+    result.cached = True
+    result.word_count = entry.meta["word_count"]
+    result.removal_count = entry.meta["removal_count"]
+    result.warnings.extend(entry.meta["warnings"])
+    result.output_name = entry.meta["output_name"]
+    with result.trace.stage("cache_read") as record:
+        if output is None:
+            result.docx = entry.read_docx()
+            record.bytes = len(result.docx)
+        else:
+            entry.copy_docx_to(output)
+
+def format_cv(file, file_name, candidate_name, age, logo_path=LOGO_PATH, pii_detector=None, pdf_workers=1,
+              trace=None, profile_path=None, output=None, cache=None, ocr=None):
+    # With `output` (a binary file object) the .docx is written there and result.docx stays empty.
+    # With `cache` (a diskcache.FormatCache built for the same logo and detector) an identical
+    # earlier request is served from disk, and new results are stored. With `ocr` (an
+    # ocr.PageOCR) scanned PDF pages are OCR'd instead of coming back empty.
+    result = FormatResult(file_name=file_name, trace=trace or PipelineTrace(label=file_name))
+    reset_peak_rss()
+    cache_writer = None
+    try:
+        with profile_to(profile_path):
+            entry = None
+            if cache is not None:
+                # Imported with the cache: diskcache loads pathlib, which plain formatting doesn't need
+                from .diskcache import upload_digest
+                with result.trace.stage("cache_lookup"):
+                    key = cache.key(upload_digest(file), candidate_name, age,
+                                    variant=ocr.fingerprint if ocr is not None else "")
+                    entry = cache.get(key)
+            if entry is not None:
+                _load_cached(result, entry, output)
+            else:
+                cache_writer = cache.writer(key) if cache is not None else None
+                _run_pipeline(result, file, file_name, candidate_name, age, logo_path, pii_detector, pdf_workers,
+                              ocr, output, cache_writer)
+                if cache_writer is not None and result.ok:
+                    cache_writer.commit({
+                        "file_name": file_name,
+                        "output_name": result.output_name,
+                        "word_count": result.word_count,
+                        "removal_count": result.removal_count,
+                        "warnings": result.warnings,
+                    })
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        if cache_writer is not None:
+            cache_writer.abort()
+    result.peak_rss = peak_rss()
+    return result
@@ -0,0 +1,418 @@
+# Asahi CV Formatter - HTTP service mode
+#
+# Exposes the formatter to other systems (e.g. the ATS integration) as a small asyncio HTTP API:
+#
+#   python -m asahi_cv.service --port 8080 --workers 4
+#
+#   POST /format?name=John%20Doe&age=30&filename=cv.pdf   body: the PDF/DOCX bytes
+#        -> 200 with the Asahi_CV_<initials>.docx, or a JSON {"error": ...}
+#   GET  /metrics   queue depth, request counts and per-stage latencies (JSON)
+#   GET  /healthz
+#
+# The event loop only parses HTTP; formatting runs in a bounded process pool. When every worker
+# is busy and the queue is full, requests are refused with 429 (Retry-After) instead of piling
+# up, and a request that takes longer than --timeout gets a 504. Uploads over SPOOL_MAX_BYTES
+# are spooled to a temporary file that the worker reads by path.
+#
+# LocalClient drives FormatterService.handle() directly, without sockets:
+#
+#   async with FormatterService(workers=2) as service:
+#       response = await LocalClient(service).post("/format", data, name="John Doe", age=30, filename="cv.pdf")
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, quote, urlencode, urlsplit
+
+from .batch import percentile
+from .document import LOGO_PATH
+from .ocr import OCR_DPI, OCR_LANGUAGES, TesseractEngine
+from .spool import COPY_CHUNK_BYTES, SPOOL_MAX_BYTES
+from .workers import format_upload, worker_pool
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+UPLOAD_TYPES = {"application/pdf": ".pdf", DOCX_MIME: ".docx"}
+
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+REQUEST_TIMEOUT_SECONDS = 60
+READ_TIMEOUT_SECONDS = 30
+# Latency samples kept per stage for /metrics
+LATENCY_WINDOW = 1024
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+    411: "Length Required", 413: "Content Too Large", 422: "Unprocessable Content", 429: "Too Many Requests",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+    body: bytes = b""
+    # Uploads over SPOOL_MAX_BYTES are spooled to this temporary file instead of `body`
+    body_file: str = ""
+
+    @property
+    def upload(self):
+        return self.body_file or self.body
+
+    def param(self, name, default=""):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+@dataclass
+class Response:
+    status: int
+    body: bytes = b""
+    headers: dict = field(default_factory=dict)
+
+    @classmethod
+    def json(cls, status, payload, **headers):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return cls(status, body, {"Content-Type": "application/json; charset=utf-8", **headers})
+
+    @classmethod
+    def error(cls, status, message, **headers):
+        return cls.json(status, {"error": message}, **headers)
+
+    @property
+    def json_body(self):
+        return json.loads(self.body)
+
+    def encode(self, keep_alive):
+        lines = [f"HTTP/1.1 {self.status} {REASONS.get(self.status, '')}"]
+        headers = {**self.headers, "Content-Length": str(len(self.body)),
+                   "Connection": "keep-alive" if keep_alive else "close"}
+        lines.extend(f"{name}: {header_value(value)}" for name, value in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + self.body
+
+def header_value(value):
+    # Header lines go out as latin-1: fold line breaks and replace what latin-1 can't carry
+    # (e.g. Japanese text in OCR warnings) rather than failing the whole response
+    value = " ".join(str(value).splitlines())
+    return value.encode("latin-1", "replace").decode("latin-1")
+
+def content_disposition(file_name):
+    # Output names follow the candidate's name, which is often Japanese: an ASCII filename for
+    # old clients plus the exact name as RFC 5987 filename*
+    fallback = "".join(c if c.isascii() and c.isprintable() and c not in '"\\' else "_" for c in file_name)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(file_name, safe='')}"
+
+# --- Metrics ---
+class ServiceMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self.responses = defaultdict(int)
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        # Peak RSS of the worker for each formatted request, for sizing the host
+        self.peak_rss = deque(maxlen=LATENCY_WINDOW)
+        self.cache_hits = 0
+
+    def observe(self, stage, seconds):
+        self.latencies[stage].append(seconds)
+
+    def peak_rss_summary(self):
+        megabytes = [value / (1024 * 1024) for value in self.peak_rss]
+        return {"count": len(megabytes), "p50_mb": percentile(megabytes, 50),
+                "p95_mb": percentile(megabytes, 95), "max_mb": max(megabytes, default=0.0)}
+
+    def latency_summary(self):
+        return {
+            stage: {
+                "count": len(samples),
+                "mean_ms": sum(samples) / len(samples) * 1000,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+            }
+            for stage, samples in self.latencies.items() if samples
+        }
+
+# --- Service ---
+class FormatterService:
+    def __init__(self, workers=None, queue_size=None, timeout=REQUEST_TIMEOUT_SECONDS, logo_path=LOGO_PATH,
+                 max_upload_bytes=MAX_UPLOAD_BYTES, cache_dir=None, ocr_languages="", ocr_dpi=OCR_DPI):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        # Requests waiting for a worker, on top of the ones being formatted
+        self.queue_size = self.workers * 2 if queue_size is None else queue_size
+        self.timeout = timeout
+        self.logo_path = str(logo_path)
+        self.max_upload_bytes = max_upload_bytes
+        self.cache_dir = str(cache_dir) if cache_dir else ""
+        # Tesseract languages for scanned PDF pages; empty leaves them unread
+        self.ocr_languages = ocr_languages
+        self.ocr_dpi = ocr_dpi
+        self.metrics = ServiceMetrics()
+        self.in_flight = 0
+        self._pool = None
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_size
+
+    def start(self):
+        if self._pool is None:
+            # Each request has a worker to itself, so scanned pages are OCR'd in it one by one
+            self._pool = worker_pool(self.workers, {"logo_path": self.logo_path, "cache_dir": self.cache_dir,
+                                                    "ocr_languages": self.ocr_languages, "ocr_dpi": self.ocr_dpi})
+        return self
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def handle(self, request):
+        try:
+            response = await self._route(request)
+        except Exception as e:
+            response = Response.error(500, f"{type(e).__name__}: {e}")
+        self.metrics.responses[response.status] += 1
+        return response
+
+    async def _route(self, request):
+        routes = {"/format": ("POST", self._format), "/metrics": ("GET", self._metrics), "/healthz": ("GET", self._health)}
+        if request.path not in routes:
+            return Response.error(404, f"No route for {request.path}")
+        method, handler = routes[request.path]
+        if request.method != method:
+            return Response.error(405, f"{request.path} only accepts {method}", Allow=method)
+        return await handler(request)
+
+    async def _health(self, request):
+        return Response.json(200, {"status": "ok"})
+
+    async def _metrics(self, request):
+        return Response.json(200, {
+            "uptime_seconds": time.time() - self.metrics.started,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "responses": {str(status): count for status, count in sorted(self.metrics.responses.items())},
+            "latency": self.metrics.latency_summary(),
+            "worker_peak_rss": self.metrics.peak_rss_summary(),
+            "cache_hits": self.metrics.cache_hits,
+        })
+
+    async def _format(self, request):
+        candidate_name = request.param("name").strip()
+        if not candidate_name:
+            return Response.error(400, "Missing query parameter: name")
+        try:
+            age = int(request.param("age"))
+        except ValueError:
+            return Response.error(400, "Query parameter age must be a whole number")
+        if not 18 <= age <= 99:
+            return Response.error(400, "Query parameter age must be between 18 and 99")
+        file_name = request.param("filename")
+        if not file_name:
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            file_name = "upload" + UPLOAD_TYPES.get(content_type, "")
+        if not file_name.lower().endswith((".pdf", ".docx")):
+            return Response.error(400, "Pass filename=<name>.pdf|.docx or a PDF/DOCX Content-Type")
+        if not request.upload:
+            return Response.error(400, "Empty request body")
+
+        # Backpressure: refuse rather than queue without bound
+        if self.in_flight >= self.capacity:
+            return Response.error(429, "Formatter is busy, retry shortly", **{"Retry-After": "1"})
+        self.start()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            # upload: the body bytes, or the path of a spooled body (read from disk, not pickled over)
+            future = self._pool.submit(format_upload, request.upload, file_name, candidate_name, age)
+        except BrokenProcessPool:
+            # The pool broke after its last request had already returned (e.g. after a 504)
+            return self._pool_crashed()
+        # Only a submitted job holds a slot; a timed-out one keeps it until the worker is really free again
+        self.in_flight += 1
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            return Response.error(504, f"Formatting took longer than {self.timeout:g}s")
+        except BrokenProcessPool:
+            return self._pool_crashed()
+        total = time.perf_counter() - started
+
+        self.metrics.observe("total", total)
+        self.metrics.observe("queue_and_transfer", max(0.0, total - result.trace.total_seconds))
+        for record in result.trace.records:
+            self.metrics.observe(record.stage, record.seconds)
+        self.metrics.peak_rss.append(result.peak_rss)
+        self.metrics.cache_hits += result.cached
+        if not result.ok:
+            return Response.error(422, result.error)
+        headers = {
+            "Content-Type": DOCX_MIME,
+            "Content-Disposition": content_disposition(result.output_name),
+            "X-Removal-Count": str(result.removal_count),
+            "X-Cache": "hit" if result.cached else "miss",
+        }
+        if result.warnings:
+            headers["X-Warnings"] = " ".join(result.warnings)
+        return Response(200, result.docx, headers)
+
+    def _release(self):
+        self.in_flight -= 1
+
+    def _pool_crashed(self):
+        # A worker died (e.g. killed for memory); start a fresh pool for the next request
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        return Response.error(503, "Formatter worker crashed, retry the request", **{"Retry-After": "1"})
+
+    # --- HTTP/1.1 transport ---
+    async def serve(self, host="127.0.0.1", port=8080):
+        self.start()
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request, keep_alive = await self._read_request(reader)
+                if request is None:
+                    break
+                if isinstance(request, Response):
+                    response = request
+                else:
+                    try:
+                        response = await self.handle(request)
+                    finally:
+                        if request.body_file:
+                            os.unlink(request.body_file)
+                writer.write(response.encode(keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        # (Request or error Response, keep-alive); (None, False) when the client has gone
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), READ_TIMEOUT_SECONDS)
+        except asyncio.IncompleteReadError:
+            return None, False
+        except asyncio.LimitOverrunError:
+            return Response.error(431, "Request headers too large"), False
+        except asyncio.TimeoutError:
+            return Response.error(408, "Timed out reading the request"), False
+
+        try:
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ")
+            headers = {}
+            for line in header_lines:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            return Response.error(400, "Malformed request"), False
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            return Response.error(411, "Send the upload with a Content-Length"), False
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            return Response.error(400, "Invalid Content-Length"), False
+        if length > self.max_upload_bytes:
+            return Response.error(413, f"Upload larger than {self.max_upload_bytes // (1024 * 1024)} MB"), False
+        url = urlsplit(target)
+        request = Request(method.upper(), url.path, parse_qs(url.query), headers)
+        try:
+            if length > SPOOL_MAX_BYTES:
+                request.body_file = await asyncio.wait_for(self._spool_body(reader, length), READ_TIMEOUT_SECONDS)
+            elif length:
+                request.body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT_SECONDS)
+        except asyncio.IncompleteReadError:
+            return None, False
+        except asyncio.TimeoutError:
+            return Response.error(408, "Timed out reading the request body"), False
+        return request, keep_alive
+
+    async def _spool_body(self, reader, length):
+        # Large uploads go to a temporary file chunk by chunk; the worker opens it by path
+        with tempfile.NamedTemporaryFile(prefix="asahi_upload_", delete=False) as handle:
+            try:
+                while length:
+                    chunk = await reader.readexactly(min(length, COPY_CHUNK_BYTES))
+                    handle.write(chunk)
+                    length -= len(chunk)
+            except BaseException:
+                handle.close()
+                os.unlink(handle.name)
+                raise
+        return handle.name
+
+class LocalClient:
+    # Calls the service in-process, skipping the HTTP transport
+    def __init__(self, service):
+        self.service = service
+
+    async def get(self, path):
+        return await self.service.handle(Request("GET", path))
+
+    async def post(self, path, body=b"", headers=None, **params):
+        query = parse_qs(urlencode({name: str(value) for name, value in params.items()}))
+        return await self.service.handle(Request("POST", path, query, {k.lower(): v for k, v in (headers or {}).items()}, body))
+
+# --- Command line ---
+def build_parser():
+    parser = argparse.ArgumentParser(description="Serve the Asahi CV formatter over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=min(4, os.cpu_count() or 1), help="Formatter processes")
+    parser.add_argument("--queue-size", type=int, help="Requests allowed to wait for a worker (default 2 per worker)")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT_SECONDS, help="Seconds before a request gets 504")
+    parser.add_argument("--max-upload-mb", type=int, default=MAX_UPLOAD_BYTES // (1024 * 1024))
+    parser.add_argument("--logo", default=LOGO_PATH, help="Logo image for the document header")
+    parser.add_argument("--cache-dir", metavar="DIR", help="On-disk cache of formatted CVs and OCR'd pages shared by the workers")
+    parser.add_argument("--ocr", action="store_true", help="OCR scanned PDF pages (needs tesseract installed)")
+    parser.add_argument("--ocr-lang", default=OCR_LANGUAGES, help="Tesseract languages for --ocr, e.g. eng+jpn")
+    parser.add_argument("--ocr-dpi", type=int, default=OCR_DPI, help="Resolution scanned pages are rendered at for OCR")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.ocr and not TesseractEngine().available():
+        build_parser().error("--ocr needs the tesseract command installed and on PATH")
+    service = FormatterService(max(1, args.workers), args.queue_size, args.timeout, args.logo,
+                               args.max_upload_mb * 1024 * 1024, args.cache_dir,
+                               args.ocr_lang if args.ocr else "", args.ocr_dpi)
+    print(f"Serving the Asahi CV formatter on http://{args.host}:{args.port} "
+          f"({service.workers} workers, {service.queue_size} queued)", flush=True)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# Asahi CV Formatter - Memory-bounded handling of uploads and generated documents
+#
+# Uploads and generated .docx files stay in memory up to SPOOL_MAX_BYTES and roll over to
+# temporary files above that (tempfile.SpooledTemporaryFile). Large PDFs are handed to PyMuPDF
+# as a file path, so MuPDF reads pages from the OS page cache on demand and page-parallel
+# workers reopen the file instead of each receiving a pickled copy of the upload.
+#
+# Peak RSS is read from /proc (Linux); reset_peak_rss() starts a new high-water mark so a
+# worker that formats one document at a time can report the peak of each request.
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+# Uploads and outputs larger than this go to a temporary file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+COPY_CHUNK_BYTES = 1024 * 1024
+
+def spooled_file(max_size=SPOOL_MAX_BYTES):
+    return tempfile.SpooledTemporaryFile(max_size=max_size, mode="w+b")
+
+def spool(file, max_size=SPOOL_MAX_BYTES):
+    # Copy bytes or a binary file object into a rewound SpooledTemporaryFile, chunk by chunk
+    spooled = spooled_file(max_size)
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        spooled.write(file)
+    else:
+        shutil.copyfileobj(file, spooled, COPY_CHUNK_BYTES)
+    spooled.seek(0)
+    return spooled
+
+def upload_size(file):
+    # Size of a path, bytes or seekable binary file object without reading it
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        return len(file)
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer().nbytes
+    if hasattr(file, "seek") and hasattr(file, "tell"):
+        position = file.tell()
+        size = file.seek(0, os.SEEK_END)
+        file.seek(position)
+        return size
+    return getattr(file, "size", 0)
+
+@contextmanager
+def file_path(file, suffix=""):
+    # Yields a filesystem path holding the upload: paths pass through, bytes and file objects
+    # (from their current position) are copied to a temporary file that is removed on exit
+    if isinstance(file, (str, os.PathLike)):
+        yield os.fspath(file)
+        return
+    handle = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        with handle:
+            if isinstance(file, (bytes, bytearray, memoryview)):
+                handle.write(file)
+            else:
+                shutil.copyfileobj(file, handle, COPY_CHUNK_BYTES)
+        yield handle.name
+    finally:
+        os.unlink(handle.name)
+
+# --- Resident memory ---
+def _proc_status_bytes(field):
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def current_rss():
+    return _proc_status_bytes("VmRSS") or 0
+
+def peak_rss():
+    # High-water mark of resident memory since process start or the last reset_peak_rss()
+    peak = _proc_status_bytes("VmHWM")
+    if peak is not None:
+        return peak
+    # ru_maxrss is in KiB on Linux and bytes on macOS, and can't be reset
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+def reset_peak_rss():
+    # Linux 4.0+: writing 5 to clear_refs resets VmHWM to the current RSS. Returns False
+    # where that isn't possible, in which case peak_rss() stays a since-startup figure.
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,104 @@
+# Asahi CV Formatter - Warm worker processes for the batch, service, export and UI pools
+#
+# Every pool starts its workers with init_worker: it compiles the PIIDetector, decodes the logo,
+# opens the disk cache and OCR engine when configured and imports PyMuPDF and python-docx, so a
+# worker's first job pays for none of it. Jobs then pass only their per-document arguments.
+#
+#   pool = worker_pool(4, {"cache_dir": "/var/cache/asahi_cv"})
+#   result = pool.submit(format_upload, data, "cv.pdf", "John Doe", 30).result()
+#
+# The Streamlit server keeps one such pool for all sessions and runs extraction and document
+# generation in it, so a long PDF blocks one worker instead of the server's interpreter.
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from .diskcache import FormatCache
+from .document import LOGO_PATH, load_logo_asset
+from .extract import extract_text
+from .instrument import PipelineTrace
+from .ocr import OCR_CACHE_SUBDIR, OCR_DPI, PageOCR, PageTextCache, TesseractEngine
+from .pii import PIIDetector
+from .pipeline import format_cv, render_docx
+from .spool import peak_rss, reset_peak_rss, upload_size
+
+# Options every worker understands; callers can add their own (e.g. batch's profile_dir)
+WORKER_OPTIONS = {
+    "logo_path": str(LOGO_PATH),
+    # On-disk FormatCache shared by the workers; empty for none
+    "cache_dir": "",
+    # Tesseract languages for scanned PDF pages; empty leaves them unread
+    "ocr_languages": "",
+    # On-disk OCR page cache; defaults to the ocr-pages subdirectory of cache_dir
+    "ocr_cache_dir": "",
+    "ocr_dpi": OCR_DPI,
+    # Processes per document for page-parallel PDF extraction and OCR
+    "pdf_workers": 1,
+}
+
+# The options and preloaded objects of this worker process
+worker_state = {}
+
+def init_worker(options):
+    worker_state.update(WORKER_OPTIONS)
+    worker_state.update(options)
+    worker_state["pii_detector"] = PIIDetector()
+    load_logo_asset(worker_state["logo_path"])
+    worker_state["cache"] = None
+    if worker_state["cache_dir"]:
+        worker_state["cache"] = FormatCache(worker_state["cache_dir"], logo_path=worker_state["logo_path"],
+                                            pii_detector=worker_state["pii_detector"])
+    worker_state["ocr"] = None
+    if worker_state["ocr_languages"]:
+        ocr_cache_dir = worker_state["ocr_cache_dir"]
+        if not ocr_cache_dir and worker_state["cache_dir"]:
+            ocr_cache_dir = os.path.join(worker_state["cache_dir"], OCR_CACHE_SUBDIR)
+        worker_state["ocr"] = PageOCR(TesseractEngine(languages=worker_state["ocr_languages"]),
+                                      dpi=worker_state["ocr_dpi"], workers=worker_state["pdf_workers"],
+                                      cache=PageTextCache(ocr_cache_dir) if ocr_cache_dir else None)
+    # Imported here rather than by the first job
+    import docx  # noqa: F401
+    import fitz  # noqa: F401  PyMuPDF
+
+def worker_pool(workers, options=None):
+    # Spawned workers: the Streamlit server and the HTTP service are threaded, and forking a
+    # threaded process is unsafe
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=init_worker, initargs=(dict(options or {}),))
+    # Start (and initialise) every worker now rather than as the first jobs arrive
+    for _ in range(workers):
+        pool.submit(int)
+    return pool
+
+def _as_file(upload):
+    # Bytes arrive pickled; anything else is a path the worker reads from disk
+    return BytesIO(upload) if isinstance(upload, bytes) else upload
+
+# --- Jobs ---
+def format_upload(upload, file_name, candidate_name, age, use_ocr=True, **kwargs):
+    # format_cv with this worker's detector, logo, cache and OCR engine; kwargs (output, trace,
+    # profile_path) go to format_cv
+    return format_cv(_as_file(upload), file_name, candidate_name, age,
+                     logo_path=worker_state["logo_path"], pii_detector=worker_state["pii_detector"],
+                     pdf_workers=worker_state["pdf_workers"], cache=worker_state["cache"],
+                     ocr=worker_state["ocr"] if use_ocr else None, **kwargs)
+
+def extract_upload(upload, file_name, use_ocr=True, track_memory=False):
+    # The extract stage alone, for callers that clean the text themselves (the UI's incremental
+    # cleaner). Returns the ExtractionResult, its StageRecords and the worker's peak RSS.
+    reset_peak_rss()
+    trace = PipelineTrace(label=file_name, track_memory=track_memory)
+    with trace.stage("extract") as record:
+        record.bytes = upload_size(upload)
+        extraction = extract_text(_as_file(upload), file_name, pdf_workers=worker_state["pdf_workers"],
+                                  ocr=worker_state["ocr"] if use_ocr else None)
+        record.lines = extraction.text.count("\n") + 1 if extraction.text else 0
+    return extraction, trace.records, peak_rss()
+
+def render_upload(cleaned_text, candidate_name, age, track_memory=False):
+    # The .docx for already cleaned text, with its StageRecords and the worker's peak RSS
+    reset_peak_rss()
+    trace = PipelineTrace(track_memory=track_memory)
+    docx_bytes = render_docx(cleaned_text, candidate_name, age, worker_state["logo_path"], trace)
+    return docx_bytes, trace.records, peak_rss()
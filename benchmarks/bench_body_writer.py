@@ -0,0 +1,62 @@
+# Microbenchmark: add_body_paragraphs vs. one doc.add_paragraph call per line
+#
+#   python benchmarks/bench_body_writer.py [--lines 1000 5000 20000]
+#
+# Also checks that both writers produce identical document.xml.
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document  # noqa: E402
+from lxml import etree  # noqa: E402
+
+from asahi_cv.document import add_body_paragraphs  # noqa: E402
+
+def synthetic_lines(count, seed=0):
+    rng = random.Random(seed)
+    words = "analysis <model> R&D data study results method system \"journal\" review network".split()
+    lines = []
+    for _ in range(count):
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(3, 18)))
+        if rng.random() < 0.05:
+            line = line.replace(" ", "\t", 1)
+        lines.append(line)
+    return lines
+
+def add_per_line(doc, lines):
+    for line in lines:
+        doc.add_paragraph(line)
+
+def time_writer(writer, lines, repeat):
+    best = float("inf")
+    doc = None
+    for _ in range(repeat):
+        doc = Document()
+        started = time.perf_counter()
+        writer(doc, lines)
+        best = min(best, time.perf_counter() - started)
+    return best, etree.tostring(doc.element)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>6} {'add_paragraph':>14} {'bulk':>10} {'speedup':>8}")
+    for count in args.lines:
+        lines = synthetic_lines(count)
+        per_line_time, per_line_xml = time_writer(add_per_line, lines, args.repeat)
+        bulk_time, bulk_xml = time_writer(add_body_paragraphs, lines, args.repeat)
+        if per_line_xml != bulk_xml:
+            print(f"XML MISMATCH at {count} lines", file=sys.stderr)
+            return 1
+        print(f"{count:>6} {per_line_time * 1000:>12.1f}ms {bulk_time * 1000:>8.1f}ms {per_line_time / bulk_time:>7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
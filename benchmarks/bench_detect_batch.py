@@ -0,0 +1,51 @@
+# Microbenchmark: detect_all_pii per document vs. detect_all_pii_batch over many documents
+#
+#   python benchmarks/bench_detect_batch.py [--docs 100 1000 5000] [--lines 10 40] [--repeat 3]
+#
+# Short CVs are the first --lines lines of synthetic CVs from corpus.py. Also checks that the
+# batch call returns exactly the per-document dicts.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from asahi_cv.pii import PIIDetector  # noqa: E402
+from corpus import synthetic_cv  # noqa: E402
+
+def short_cvs(count, lines):
+    return ["\n".join(synthetic_cv(1, seed=seed).lines[:lines]) for seed in range(count)]
+
+def best_time(func, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    detector = PIIDetector()
+    print(f"{'docs':>6} {'lines':>6} {'per doc':>10} {'batch':>10} {'speedup':>8}")
+    for lines in args.lines:
+        for count in args.docs:
+            texts = short_cvs(count, lines)
+            loop_time, expected = best_time(lambda: [detector.detect_all_pii(text) for text in texts], args.repeat)
+            batch_time, results = best_time(lambda: detector.detect_all_pii_batch(texts), args.repeat)
+            if results != expected:
+                print(f"RESULT MISMATCH at {count} docs of {lines} lines", file=sys.stderr)
+                return 1
+            print(f"{count:>6} {lines:>6} {loop_time * 1000:>8.1f}ms {batch_time * 1000:>8.1f}ms "
+                  f"{loop_time / batch_time:>7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
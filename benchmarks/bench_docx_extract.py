@@ -0,0 +1,111 @@
+# Microbenchmark: streaming DOCX extraction vs. loading the package with python-docx
+#
+#   python benchmarks/bench_docx_extract.py [--image-mb 0 5 20 50] [--images 4] [--pages 5]
+#
+# Builds image-heavy CVs (a synthetic CV from corpus.py plus --images incompressible PNGs of
+# the given total size) and reports time, and peak RSS growth in a fresh process, for each
+# extractor. The
+# python-docx path reads every part, images included, into memory; the streaming path only
+# reads word/document.xml. Also checks that both return the same body-paragraph text (the
+# corpus CVs have no tables, which only the streaming extractor reads).
+import argparse
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document  # noqa: E402
+from docx.shared import Inches  # noqa: E402
+
+from asahi_cv.extract import extract_text_from_docx  # noqa: E402
+from asahi_cv.spool import current_rss, peak_rss, reset_peak_rss  # noqa: E402
+from corpus import synthetic_cv  # noqa: E402
+
+def noise_png(size_bytes):
+    # Greyscale PNG of random pixels, so the zip can't shrink it
+    width = 1024
+    height = max(1, size_bytes // (width + 1))
+    raw = b"".join(b"\0" + os.urandom(width) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 0)) + chunk(b"IEND", b"")
+
+def image_heavy_docx(path, pages, image_mb, images):
+    doc = Document()
+    for line in synthetic_cv(pages).lines:
+        doc.add_paragraph(line)
+    if image_mb:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for index in range(images):
+                image_path = Path(temp_dir) / f"image{index}.png"
+                image_path.write_bytes(noise_png(image_mb * 1024 * 1024 // images))
+                doc.add_picture(str(image_path), width=Inches(2))
+    doc.save(path)
+
+def python_docx_text(path):
+    # The extractor this module replaced: body paragraphs only, whole package loaded
+    return "\n".join(para.text for para in Document(path).paragraphs)
+
+def streaming_text(path):
+    return extract_text_from_docx(path).text
+
+EXTRACTORS = {"python-docx": python_docx_text, "streaming": streaming_text}
+
+def _peak_rss_growth(extractor_name, path, warmup_path):
+    # Runs in a fresh process, so memory freed by earlier runs can't hide the peak; a warm-up
+    # on a small CV keeps library imports out of the figure
+    extractor = EXTRACTORS[extractor_name]
+    extractor(warmup_path)
+    reset_peak_rss()
+    baseline = current_rss()
+    extractor(path)
+    return max(0, peak_rss() - baseline)
+
+def measure(extractor_name, path, warmup_path, repeat):
+    extractor = EXTRACTORS[extractor_name]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = extractor(path)
+        best = min(best, time.perf_counter() - started)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        peak = pool.submit(_peak_rss_growth, extractor_name, str(path), str(warmup_path)).result()
+    return best, peak, text
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--image-mb", type=int, nargs="+", default=[0, 5, 20, 50],
+                        help="Total size of the embedded images per CV")
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'images':>7} {'file':>8} {'python-docx':>12} {'peak':>8} {'streaming':>10} {'peak':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        warmup_path = Path(temp_dir) / "warmup.docx"
+        image_heavy_docx(warmup_path, 1, 0, 0)
+        for image_mb in args.image_mb:
+            path = Path(temp_dir) / f"cv_{image_mb}mb.docx"
+            image_heavy_docx(path, args.pages, image_mb, args.images)
+            old_time, old_peak, old_text = measure("python-docx", path, warmup_path, args.repeat)
+            new_time, new_peak, new_text = measure("streaming", path, warmup_path, args.repeat)
+            if old_text != new_text:
+                print(f"TEXT MISMATCH with {image_mb} MB of images", file=sys.stderr)
+                return 1
+            print(f"{image_mb:>5}MB {path.stat().st_size / (1024 * 1024):>6.1f}MB "
+                  f"{old_time * 1000:>10.1f}ms {old_peak / (1024 * 1024):>6.1f}MB "
+                  f"{new_time * 1000:>8.1f}ms {new_peak / (1024 * 1024):>6.1f}MB {old_time / new_time:>7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
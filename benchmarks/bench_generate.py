@@ -0,0 +1,88 @@
+# Benchmark: generate_asahi_cv from the cached DocumentTemplate vs. building every document from scratch
+#
+#   python benchmarks/bench_generate.py [--cvs 500]
+#
+# Reports mean per-document generation and save time over a batch of synthetic CVs.
+import argparse
+import random
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx import Document  # noqa: E402
+from docx.enum.text import WD_ALIGN_PARAGRAPH  # noqa: E402
+from docx.shared import Inches, Pt  # noqa: E402
+
+from asahi_cv.document import (  # noqa: E402
+    abbreviate_name_age,
+    add_header_with_logo,
+    generate_asahi_cv,
+    load_logo_asset,
+)
+
+def generate_from_scratch(cleaned_text, logo, candidate_name, age):
+    # generate_asahi_cv as it was before the template: every document rebuilt from Document()
+    doc = Document()
+    for section in doc.sections:
+        section.top_margin = Inches(1.2)
+        section.bottom_margin = Inches(0.8)
+        section.left_margin = Inches(0.8)
+        section.right_margin = Inches(0.8)
+    add_header_with_logo(doc, logo)
+    font = doc.styles['Normal'].font
+    font.name = 'Calibri'
+    font.size = Pt(11)
+    name_paragraph = doc.add_paragraph()
+    name_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    name_paragraph.paragraph_format.space_after = Pt(24)
+    name_run = name_paragraph.add_run(abbreviate_name_age(candidate_name, age))
+    name_run.font.name = 'ＭＳ 明朝'
+    name_run.font.size = Pt(16)
+    name_run.font.bold = True
+    doc.add_paragraph()
+    for line in cleaned_text.strip().split("\n"):
+        if line.strip():
+            doc.add_paragraph(line.strip())
+    return doc
+
+def synthetic_cleaned_texts(count, seed=0):
+    rng = random.Random(seed)
+    words = "managed designed built led analysed delivered data systems team project client sales model".split()
+    return [
+        "\n".join(" ".join(rng.choice(words) for _ in range(rng.randint(4, 16))).capitalize()
+                  for _ in range(rng.randint(30, 90)))
+        for _ in range(count)
+    ]
+
+def time_batch(generate, texts, logo):
+    generate_seconds = save_seconds = 0.0
+    for index, text in enumerate(texts):
+        started = time.perf_counter()
+        doc = generate(text, logo, f"Candidate Number {index}", 30)
+        generated = time.perf_counter()
+        doc.save(BytesIO())
+        save_seconds += time.perf_counter() - generated
+        generate_seconds += generated - started
+    return generate_seconds / len(texts), save_seconds / len(texts)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cvs", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    logo = load_logo_asset()
+    texts = synthetic_cleaned_texts(args.cvs)
+    print(f"{args.cvs} CVs, mean per document:")
+    results = {}
+    for label, generate in (("scratch", generate_from_scratch), ("template", generate_asahi_cv)):
+        results[label] = time_batch(generate, texts, logo)
+        gen, save = results[label]
+        print(f"  {label:<9} generate {gen * 1000:6.2f} ms   save {save * 1000:6.2f} ms")
+    print(f"  generation speedup {results['scratch'][0] / results['template'][0]:.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# Benchmark: cold-start import cost of the core package vs. the Streamlit front end
+#
+#   python benchmarks/bench_import.py [--repeat 5]
+#
+# Runs `python -X importtime -c "import ..."` in fresh interpreters and reports the median
+# cumulative import time of each target, minus the interpreter's own startup imports.
+# "eager deps" is what every pool worker paid when the formatter was a single module
+# importing streamlit, fitz, docx and PIL at the top.
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGETS = {
+    "asahi_cv.pii": "import asahi_cv.pii",
+    "asahi_cv.pipeline": "import asahi_cv.pipeline",
+    "asahi2_cv_formatter (UI)": "import asahi2_cv_formatter",
+    "eager deps": "import streamlit, fitz, docx, PIL",
+}
+
+def import_time_us(statement):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    total = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level imports have no indentation in the name column
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    startup = statistics.median(import_time_us("pass") for _ in range(args.repeat))
+    for label, statement in TARGETS.items():
+        times = [import_time_us(statement) - startup for _ in range(args.repeat)]
+        print(f"{label:<26} {statistics.median(times) / 1000:8.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
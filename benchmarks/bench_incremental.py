@@ -0,0 +1,68 @@
+# Benchmark: re-cleaning an edited CV with IncrementalCleaner vs. a full clean_text
+#
+#   python benchmarks/bench_incremental.py [--pages 5 20 100] [--edits 1 5 50] [--repeat 5]
+#
+# Cleans a synthetic CV once to warm the cleaner, then re-cleans copies with a few lines edited
+# (the typical fix-and-re-upload). Every result is checked against clean_text on the same text.
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from asahi_cv.incremental import IncrementalCleaner  # noqa: E402
+from asahi_cv.pii import PIIDetector  # noqa: E402
+from asahi_cv.pipeline import clean_text  # noqa: E402
+from corpus import synthetic_cv  # noqa: E402
+
+EDITS = ["- Reduced release time by half.", "Phone: +81 90-5555-0101", "", "Kansai Logistics (2019 - 2024)"]
+
+def edited(text, count, rng):
+    lines = text.split("\n")
+    for _ in range(count):
+        index = rng.randrange(len(lines))
+        if rng.random() < 0.5:
+            lines[index] += " " + rng.choice(["and mentored two engineers", "on schedule"])
+        else:
+            lines.insert(index, rng.choice(EDITS))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 100])
+    parser.add_argument("--edits", type=int, nargs="+", default=[1, 5, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    detector = PIIDetector()
+    rng = random.Random(0)
+    print(f"{'pages':>5} {'edits':>5} {'full':>10} {'incremental':>12} {'speedup':>8} {'rescans':>8}")
+    for pages in args.pages:
+        text = synthetic_cv(pages, seed=pages).text
+        for edit_count in args.edits:
+            full_time = incremental_time = 0.0
+            rescans = 0
+            for _ in range(args.repeat):
+                cleaner = IncrementalCleaner(detector)
+                cleaner.clean(text)
+                new_text = edited(text, edit_count, rng)
+
+                started = time.perf_counter()
+                expected = clean_text(new_text, detector)
+                full_time += time.perf_counter() - started
+                started = time.perf_counter()
+                result = cleaner.clean(new_text)
+                incremental_time += time.perf_counter() - started
+                rescans += cleaner.last_run["full_rescan"]
+                if result != expected:
+                    print(f"MISMATCH at {pages} pages, {edit_count} edits", file=sys.stderr)
+                    return 1
+            print(f"{pages:>5} {edit_count:>5} {full_time / args.repeat * 1000:>8.1f}ms "
+                  f"{incremental_time / args.repeat * 1000:>10.2f}ms {full_time / incremental_time:>7.1f}x "
+                  f"{rescans:>4}/{args.repeat}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
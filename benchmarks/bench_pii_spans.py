@@ -0,0 +1,63 @@
+# Microbenchmark: detect_all_pii dicts vs. detect_pii_spans span arrays
+#
+#   python benchmarks/bench_pii_spans.py [--pages 1 5 20] [--docs 200] [--repeat 3]
+#
+# Reports detection time per document and the memory the results of --docs documents hold
+# (traced allocations kept after detection; the texts themselves are not counted). Also checks
+# that PIISpans.to_dict() equals detect_all_pii and that remove_pii gives the same output.
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from asahi_cv.pii import PIIDetector  # noqa: E402
+from corpus import synthetic_cv  # noqa: E402
+
+def best_time(func, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(texts)
+
+def retained_bytes(func, texts):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    results = [func(text) for text in texts]
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del results
+    return retained
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    detector = PIIDetector()
+    print(f"{'pages':>5} {'dict':>9} {'spans':>9} {'dict mem':>10} {'spans mem':>10} {'ratio':>6}")
+    for pages in args.pages:
+        texts = [synthetic_cv(pages, seed=seed).text for seed in range(args.docs)]
+        for text in texts[:20]:
+            spans = detector.detect_pii_spans(text)
+            detected_pii = detector.detect_all_pii(text)
+            if spans.to_dict() != detected_pii or detector.remove_pii(text, spans) != detector.remove_pii(text, detected_pii):
+                print(f"RESULT MISMATCH at {pages} pages", file=sys.stderr)
+                return 1
+        dict_time = best_time(detector.detect_all_pii, texts, args.repeat)
+        spans_time = best_time(detector.detect_pii_spans, texts, args.repeat)
+        dict_memory = retained_bytes(detector.detect_all_pii, texts) / len(texts)
+        spans_memory = retained_bytes(detector.detect_pii_spans, texts) / len(texts)
+        print(f"{pages:>5} {dict_time * 1000:>7.2f}ms {spans_time * 1000:>7.2f}ms "
+              f"{dict_memory / 1024:>8.1f}KB {spans_memory / 1024:>8.1f}KB {dict_memory / spans_memory:>5.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# Benchmark: worst-case scaling of the PIIDetector regexes on adversarial input, plus parity
+# with the pre-hardening pattern set
+#
+#   python benchmarks/bench_regex_scaling.py [--sizes 2000 16000] [--reference]
+#
+# Scaling: every detector pattern, name pattern, the line scanner and remove_pii run on inputs
+# built to provoke backtracking (long digit/separator runs, flattened table rows, base64-like
+# garbage, repeated keywords). Doubling the input must at most roughly double the time; any
+# target growing faster than --max-growth per doubling fails the run. --reference also times
+# the old patterns (slow: the old address pattern takes seconds at 8k characters).
+#
+# Parity: on the labelled synthetic corpus (benchmarks/corpus.py) both pattern sets must find
+# every planted value, and a fuzzed line sample must get the same keep/remove decision.
+import argparse
+import math
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from asahi_cv.pii import PIIDetector  # noqa: E402
+from corpus import leaked_pii, synthetic_cv  # noqa: E402
+
+# The patterns as they were before hardening; the line patterns become one-step rules
+REFERENCE_PATTERNS = {
+    'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    'address': r'\d+\s+[\w\s,.-]+(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd|court|ct|place|pl)(?:\s+(?:apt|apartment|unit|#)\s*\w+)?',
+    'height': r'\b(?:\d+\'\s*\d+\"|\d+\s*ft\s*\d+\s*in|\d+\.\d+\s*m|\d+\s*cm)\b',
+    'weight': r'\b\d+(?:\.\d+)?\s*(?:lbs?|pounds?|kg|kilograms?)\b',
+    'date_of_birth': r'\b(?:DOB|Date of Birth|Born):?\s*(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',
+}
+REFERENCE_NAME_PATTERNS = {
+    1: r'(?:Name|Full Name|Candidate):?\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]*)+)',
+    4: r'(?:Name|Full Name|Candidate):?\s*([A-Z]{2,}(?:\s+[A-Z]{2,})+)',
+}
+REFERENCE_LINE_PATTERNS = [
+    r'(?:tel\.?\s*no\.?|phone|mobile|contact).*?[\+\(]?\d{1,4}[\s\-\(\)]*\d{3,4}[\s\-]*\d{3,4}',
+    r'email.*?[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}',
+    r'(?:address|location).*?\d+.*?(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd)',
+    r'(?:height|weight|born|dob|date of birth)',
+    r'(?:nationality|citizenship|passport|visa)',
+    r'(?:marital|married|single|divorced)',
+]
+
+def reference_detector():
+    detector = PIIDetector()
+    for pii_type, pattern in REFERENCE_PATTERNS.items():
+        flags = detector.patterns[pii_type].flags & re.IGNORECASE
+        detector.patterns[pii_type] = re.compile(pattern, flags)
+    name_patterns = list(PIIDetector.NAME_PATTERNS)
+    for index, pattern in REFERENCE_NAME_PATTERNS.items():
+        name_patterns[index] = re.compile(pattern, re.IGNORECASE)
+    detector.NAME_PATTERNS = tuple(name_patterns)
+    detector.pii_line_rules = [(re.compile(pattern, re.IGNORECASE),) for pattern in REFERENCE_LINE_PATTERNS]
+    return detector
+
+# --- Adversarial inputs: name -> builder of roughly n characters ---
+_GARBAGE = random.Random(0)
+BASE64 = "".join(_GARBAGE.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/")
+                 for _ in range(1 << 20))
+
+ADVERSARIAL_INPUTS = {
+    "digit run": lambda n: "1" * n,
+    "digits and spaces": lambda n: "1 " * (n // 2),
+    "flattened table row": lambda n: "Tel 12" + " " * n + "x",
+    "dotted run": lambda n: "a." * (n // 2),
+    "at signs": lambda n: "x@" + "a." * (n // 2),
+    "glued labels": lambda n: "name" * (n // 4),
+    "repeated phone": lambda n: "phone " * (n // 6) + "x",
+    "phone separators": lambda n: "phone 1" + "-" * n,
+    "address numbers": lambda n: "address " + "1 a " * (n // 4),
+    "address lines": lambda n: "1 a\n" * (n // 4),
+    "email dots": lambda n: "email " + "a." * (n // 2),
+    "capitalised words": lambda n: "Aa " * (n // 3) + "x",
+    "base64": lambda n: BASE64[:n],
+}
+
+def targets(detector):
+    found = {f"pattern {pii_type}": pattern.findall for pii_type, pattern in detector.patterns.items()}
+    found.update((f"name pattern {index}", pattern.findall) for index, pattern in enumerate(detector.NAME_PATTERNS))
+    found["line scanner"] = detector.build_line_scanner({}).line_contains_pii
+    found["remove_pii"] = lambda text: detector.remove_pii(text, detector.detect_all_pii(text))
+    return found
+
+def best_time(func, text, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def scaling(detector, sizes, max_growth, label):
+    # Worst growth factor of every (target, input) pair: the time ratio between the largest and
+    # smallest input, scaled to one doubling (geometric mean, so one noisy step can't fail a run)
+    failures = []
+    doublings = math.log2(sizes[-1] / sizes[0])
+    print(f"{label}: worst time growth per doubling of the input ({sizes[0]}..{sizes[-1]} chars)")
+    for target, func in targets(detector).items():
+        worst = (0.0, "", 0.0)
+        for input_name, build in ADVERSARIAL_INPUTS.items():
+            first, last = best_time(func, build(sizes[0])), best_time(func, build(sizes[-1]))
+            # Ignore timings under a few milliseconds, where noise dominates
+            if last < 3e-3:
+                continue
+            growth = (last / first) ** (1 / doublings)
+            if growth > worst[0]:
+                worst = (growth, input_name, last)
+        status = "FAIL" if worst[0] > max_growth else "ok"
+        print(f"  {target:<22} {worst[0]:5.1f}x  {worst[2] * 1000:9.1f} ms  ({worst[1] or '-'})  {status}")
+        if worst[0] > max_growth:
+            failures.append(target)
+    return failures
+
+def fuzz_lines(count, seed=0):
+    rng = random.Random(seed)
+    pieces = ["tel", "Tel. No.", "phone", "mobile", "contact", "email", "address", "location", "12", "1",
+              "090", "1234", "5678", "+81", "(06)", "-", " ", "  ", "street", "St", "avenue", "rd", "jane@",
+              "example.com", "@x.co", "a.b", "height", "born", "visa", "single", "project", "university", ":",
+              "Osaka", "Sakura", "\t"]
+    return ["".join(rng.choice(pieces) + rng.choice(["", " "]) for _ in range(rng.randint(1, 12)))
+            for _ in range(count)]
+
+def parity(detector, reference, documents, fuzz_count):
+    failures = []
+    missed = {"hardened": 0, "reference": 0}
+    changed = 0
+    for seed in range(documents):
+        cv = synthetic_cv(pages=1 + seed % 5, seed=seed)
+        text = cv.text
+        outputs = {}
+        for label, candidate in (("hardened", detector), ("reference", reference)):
+            outputs[label], _ = candidate.remove_pii(text, candidate.detect_all_pii(text))
+            missed[label] += len(leaked_pii(cv, outputs[label]))
+        changed += outputs["hardened"] != outputs["reference"]
+    print(f"labelled corpus: {documents} CVs, planted values missed: hardened {missed['hardened']}, "
+          f"reference {missed['reference']}; outputs differing: {changed}")
+    if missed["hardened"] > missed["reference"]:
+        failures.append("labelled corpus recall")
+
+    scanner, reference_scanner = detector.build_line_scanner({}), reference.build_line_scanner({})
+    mismatches = [line for line in fuzz_lines(fuzz_count)
+                  if scanner.line_contains_pii(line) != reference_scanner.line_contains_pii(line)]
+    print(f"fuzzed lines: {fuzz_count}, line-rule decisions differing: {len(mismatches)}")
+    for line in mismatches[:5]:
+        print(f"  {line!r}")
+    if mismatches:
+        failures.append("line rule parity")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs=2, default=[2000, 16000], metavar=("SMALL", "LARGE"))
+    parser.add_argument("--max-growth", type=float, default=3.0,
+                        help="Largest allowed time growth per doubling (2.0 is linear)")
+    parser.add_argument("--documents", type=int, default=200, help="Labelled CVs for the parity check")
+    parser.add_argument("--fuzz", type=int, default=20000, help="Fuzzed lines for the line-rule parity check")
+    parser.add_argument("--reference", action="store_true", help="Also time the pre-hardening patterns")
+    args = parser.parse_args(argv)
+
+    detector, reference = PIIDetector(), reference_detector()
+    failures = scaling(detector, args.sizes, args.max_growth, "hardened patterns")
+    if args.reference:
+        scaling(reference, args.sizes, args.max_growth, "reference patterns")
+    failures += parity(detector, reference, args.documents, args.fuzz)
+    if failures:
+        print(f"FAILED: {', '.join(failures)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
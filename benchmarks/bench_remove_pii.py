@@ -0,0 +1,124 @@
+# Benchmark: PIIDetector.remove_pii line scanner vs. the original nested-loop implementation
+#
+#   python benchmarks/bench_remove_pii.py [--pages 30] [--repeat 5]
+#
+# Checks that both implementations give byte-identical output on synthetic academic CVs
+# and prints the speedup.
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from asahi_cv.pii import PIIDetector  # noqa: E402
+
+WORK_KEYWORDS = ['experience', 'work', 'employment', 'company', 'project', 'skill', 'education', 'university', 'college']
+
+# The line patterns as they were written before the scanner (anchored with .* and used with match)
+REFERENCE_LINE_PATTERNS = [
+    re.compile(r'.*(?:tel\.?\s*no\.?|phone|mobile|contact).*?[\+\(]?\d{1,4}[\s\-\(\)]*\d{3,4}[\s\-]*\d{3,4}.*', re.IGNORECASE),
+    re.compile(r'.*email.*?[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}.*', re.IGNORECASE),
+    re.compile(r'.*(?:address|location).*?\d+.*?(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|boulevard|blvd).*', re.IGNORECASE),
+    re.compile(r'.*(?:height|weight|born|dob|date of birth).*', re.IGNORECASE),
+    re.compile(r'.*(?:nationality|citizenship|passport|visa).*', re.IGNORECASE),
+    re.compile(r'.*(?:marital|married|single|divorced).*', re.IGNORECASE),
+]
+
+def reference_filter_lines(detector, cleaned_text, detected_pii):
+    # Line filtering exactly as remove_pii did it before the scanner
+    removal_count = 0
+    filtered_lines = []
+    for line in cleaned_text.split('\n'):
+        line_contains_pii = False
+        original_line = line.strip()
+        for pii_pattern in REFERENCE_LINE_PATTERNS:
+            if pii_pattern.match(line):
+                line_contains_pii = True
+                removal_count += 1
+                break
+        if not line_contains_pii:
+            for pii_type, items in detected_pii.items():
+                for item in items:
+                    if item and len(str(item).strip()) > 1:
+                        if str(item).lower() in line.lower():
+                            line_contains_pii = True
+                            removal_count += 1
+                            break
+                if line_contains_pii:
+                    break
+        if not line_contains_pii:
+            line_lower = line.lower()
+            for keyword in detector.personal_keywords:
+                if keyword in line_lower:
+                    if not any(work_keyword in line_lower for work_keyword in WORK_KEYWORDS):
+                        line_contains_pii = True
+                        removal_count += 1
+                        break
+        if not line_contains_pii and original_line:
+            filtered_lines.append(original_line)
+    return '\n'.join(filtered_lines), removal_count
+
+def scanner_filter_lines(detector, cleaned_text, detected_pii):
+    scanner = detector.build_line_scanner(detected_pii)
+    removal_count = 0
+    filtered_lines = []
+    for line in cleaned_text.split('\n'):
+        if scanner.line_contains_pii(line):
+            removal_count += 1
+        elif line.strip():
+            filtered_lines.append(line.strip())
+    return '\n'.join(filtered_lines), removal_count
+
+def synthetic_cv(pages, seed=0):
+    rng = random.Random(seed)
+    words = ("analysis model protein network learning data study results method system journal "
+             "review neural cell growth theory design sample control field test signal").split()
+    lines = ["Curriculum Vitae", "Email: jane.doe@example.com", "Phone: +81 90 1234 5678",
+             "Address: 12 Sakura Street, Osaka", "Nationality: Japanese", ""]
+    for page in range(pages):
+        lines.append("Publications")
+        for _ in range(45):
+            title = " ".join(rng.choice(words) for _ in range(rng.randint(6, 14))).capitalize()
+            lines.append(f"{rng.choice(['Tanaka', 'Smith', 'Garcia'])} et al. ({rng.randint(1990, 2024)}). "
+                         f"{title}. Journal of {rng.choice(words).title()}, {rng.randint(1, 99)}({rng.randint(1, 12)}).")
+            if rng.random() < 0.05:
+                lines.append(f"Contact the lab at lab{rng.randint(1, 99)}@univ.example.org")
+            if rng.random() < 0.05:
+                lines.append("Project work on single-cell analysis at Kyoto University")
+        lines.append("")
+    return "\n".join(lines)
+
+def best_of(repeat, func, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    detector = PIIDetector()
+    print(f"{'pages':>5} {'lines':>7} {'reference':>11} {'scanner':>11} {'speedup':>8}")
+    for pages in args.pages:
+        text = synthetic_cv(pages)
+        detected_pii = detector.detect_all_pii(text)
+        ref_time, ref_result = best_of(args.repeat, reference_filter_lines, detector, text, detected_pii)
+        new_time, new_result = best_of(args.repeat, scanner_filter_lines, detector, text, detected_pii)
+        if ref_result != new_result:
+            print(f"MISMATCH at {pages} pages", file=sys.stderr)
+            return 1
+        print(f"{pages:>5} {text.count(chr(10)) + 1:>7} {ref_time * 1000:>9.1f}ms {new_time * 1000:>9.1f}ms "
+              f"{ref_time / new_time:>7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# Synthetic CV corpus: seeded CVs of controlled size with planted PII, as PDF and DOCX
+#
+#   python benchmarks/corpus.py corpus/ [--count 20] [--pages 1 5 20] [--seed 0]
+#
+# Every CV is reproducible from (seed, index, pages). The output directory gets the PDF and
+# DOCX files, a manifest.csv (file, name, age) that `python -m asahi_cv.batch` accepts, and
+# planted.json listing the PII planted in each file, so benchmarks can count leaks.
+import argparse
+import csv
+import json
+import random
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+LINES_PER_PAGE = 45
+
+FIRST_NAMES = ["Hanako", "Taro", "Yuki", "Kenji", "Emily", "James", "Maria", "Wei", "Priya", "Lucas"]
+LAST_NAMES = ["Suzuki", "Tanaka", "Watanabe", "Smith", "Garcia", "Chen", "Patel", "Martin", "Kim", "Brown"]
+STREETS = ["Sakura", "Maple", "Hill", "Station", "River", "Park", "Oak", "Castle"]
+STREET_TYPES = ["Street", "Avenue", "Road", "Drive", "Lane", "Boulevard"]
+EMPLOYERS = ["Kansai Logistics", "Osaka Precision Works", "Northwind Trading", "Blue Harbor Systems"]
+WORDS = ("managed designed built led analysed delivered reduced improved data systems team project "
+         "client sales model pipeline quality release budget schedule process customer service "
+         "network maintenance training production safety inspection report analysis").split()
+
+@dataclass
+class SyntheticCV:
+    name: str
+    age: int
+    lines: list
+    # PII type -> values planted in the text, each of which should be gone after remove_pii
+    planted: dict = field(default_factory=dict)
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+def _sentence(rng, low=6, high=14):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+def _phone(rng):
+    if rng.random() < 0.5:
+        return f"+81 {rng.choice(['80', '90'])}-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}"
+    return f"({rng.randint(200, 989)}) {rng.randint(200, 989)}-{rng.randint(1000, 9999)}"
+
+def synthetic_cv(pages, seed=0):
+    # About LINES_PER_PAGE lines per page: a personal details block, then experience entries
+    rng = random.Random(seed)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    name = f"{first} {last}"
+    age = rng.randint(22, 60)
+    email = f"{first.lower()}.{last.lower()}{rng.randint(1, 99)}@example.com"
+    phone = _phone(rng)
+    address = f"{rng.randint(1, 999)} {rng.choice(STREETS)} {rng.choice(STREET_TYPES)}"
+    zip_code = f"{rng.randint(10000, 99999)}"
+    date_of_birth = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{2024 - age}"
+    linkedin = f"linkedin.com/in/{first.lower()}-{last.lower()}-{rng.randint(100, 999)}"
+    planted = {
+        "name": [name],
+        "email": [email],
+        "phone": [phone],
+        "address": [address],
+        "zip_code": [zip_code],
+        "date_of_birth": [date_of_birth],
+        "linkedin": [linkedin],
+    }
+
+    lines = [
+        name,
+        "Curriculum Vitae",
+        f"Email: {email}",
+        f"Phone: {phone}",
+        f"Address: {address}, Osaka {zip_code}",
+        f"Date of Birth: {date_of_birth}",
+        f"Height: {rng.randint(150, 190)} cm",
+        f"Nationality: {rng.choice(['Japanese', 'British', 'Indian', 'Brazilian'])}",
+        f"LinkedIn: {linkedin}",
+        "",
+        "Professional Summary",
+        _sentence(rng, 12, 20),
+        "",
+    ]
+    target = max(1, pages) * LINES_PER_PAGE
+    while len(lines) < target:
+        lines.append("Work Experience")
+        lines.append(f"{rng.choice(EMPLOYERS)} ({rng.randint(1995, 2015)} - {rng.randint(2016, 2024)})")
+        for _ in range(rng.randint(6, 12)):
+            lines.append("- " + _sentence(rng))
+            # PII also turns up inside the body, e.g. a contact line under a project
+            if rng.random() < 0.03:
+                lines.append(f"Contact: {email}")
+        lines.append("")
+    return SyntheticCV(name=name, age=age, lines=lines[:target], planted=planted)
+
+# --- Writers ---
+def write_pdf(cv, path):
+    import fitz  # PyMuPDF
+    with fitz.open() as doc:
+        for start in range(0, len(cv.lines), LINES_PER_PAGE):
+            page = doc.new_page()
+            page.insert_text((50, 60), "\n".join(cv.lines[start:start + LINES_PER_PAGE]), fontsize=10)
+        doc.save(str(path))
+
+def write_docx(cv, path):
+    from docx import Document
+    doc = Document()
+    for line in cv.lines:
+        doc.add_paragraph(line)
+    doc.save(str(path))
+
+def leaked_pii(cv, cleaned_text):
+    # Planted values that survived PII removal, as "type: value" strings
+    lowered = cleaned_text.lower()
+    return [f"{pii_type}: {value}" for pii_type, values in cv.planted.items()
+            for value in values if value.lower() in lowered]
+
+def build_corpus(output_dir, count, pages=(1,), seed=0, formats=("pdf", "docx")):
+    # count CVs of each page size, written in every format; returns [(path, cv)]
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    documents = []
+    for page_count in pages:
+        for index in range(count):
+            cv = synthetic_cv(page_count, seed=seed * 1_000_003 + page_count * 10_007 + index)
+            for file_format in formats:
+                path = output_dir / f"cv_{page_count:03d}p_{index:04d}.{file_format}"
+                (write_pdf if file_format == "pdf" else write_docx)(cv, path)
+                documents.append((path, cv))
+
+    with open(output_dir / "manifest.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file", "name", "age"])
+        for path, cv in documents:
+            writer.writerow([path.name, cv.name, cv.age])
+    with open(output_dir / "planted.json", "w", encoding="utf-8") as f:
+        json.dump({path.name: asdict(cv) for path, cv in documents}, f, indent=1)
+    return documents
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output_dir")
+    parser.add_argument("--count", type=int, default=20, help="CVs per page size")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="+", choices=["pdf", "docx"], default=["pdf", "docx"])
+    args = parser.parse_args(argv)
+
+    documents = build_corpus(args.output_dir, args.count, args.pages, args.seed, args.formats)
+    print(f"Wrote {len(documents)} files to {args.output_dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# Benchmark suite: per-stage throughput and memory on the synthetic corpus, with a regression gate
+#
+#   python benchmarks/run.py [--count 10] [--pages 1 5 20] [--repeat 3]
+#   python benchmarks/run.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/run.py --baseline benchmarks/baseline.json [--tolerance 0.25]
+#
+# Builds a seeded corpus (benchmarks/corpus.py) in a temporary directory, then times every
+# pipeline stage over it: PDF and DOCX extraction, detect_all_pii, detect_names, remove_pii,
+# generate_asahi_cv, save and end-to-end format_cv. Each stage reports documents/sec (best of
+# --repeat per document), MB/s of input and peak traced memory. The run also counts planted
+# PII values that survive removal. Runs fully offline.
+#
+# Baselines are machine-specific: record one on the machine that will run the gate.
+# With --baseline, the run fails (exit 1) when a stage's docs/sec falls more than --tolerance
+# below the baseline, or when more planted PII leaks than in the baseline.
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from asahi_cv.document import generate_asahi_cv, load_logo_asset  # noqa: E402
+from asahi_cv.extract import extract_text, extract_text_from_docx, extract_text_from_pdf  # noqa: E402
+from asahi_cv.pii import PIIDetector  # noqa: E402
+from asahi_cv.pipeline import clean_text, format_cv  # noqa: E402
+from corpus import build_corpus, leaked_pii  # noqa: E402
+
+def measure(func, items, repeat):
+    # Sum of each document's best time over `repeat` runs (steadier than best whole passes on a
+    # busy machine), then one extra pass under tracemalloc for the peak
+    best = 0.0
+    for item in items:
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func(item)
+            times.append(time.perf_counter() - started)
+        best += min(times)
+    tracemalloc.start()
+    try:
+        for item in items:
+            func(item)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def stage_cases(documents, detector, logo):
+    # (stage, function, inputs, input bytes) for one page size; inputs are prepared up front
+    # so each stage is timed on its own
+    pdfs = [(path, cv) for path, cv in documents if path.suffix == ".pdf"]
+    docxs = [(path, cv) for path, cv in documents if path.suffix == ".docx"]
+    texts = [extract_text_from_pdf(path).text for path, _ in pdfs]
+    text_bytes = sum(len(text.encode("utf-8")) for text in texts)
+    detected = [(text, detector.detect_all_pii(text), detector.detect_names(text)) for text in texts]
+    cleaned = [detector.remove_pii(*args)[0] for args in detected]
+    generated = [generate_asahi_cv(text, logo, cv.name, cv.age) for text, (_, cv) in zip(cleaned, pdfs)]
+
+    return [
+        ("extract_pdf", lambda item: extract_text_from_pdf(item[0]), pdfs,
+         sum(path.stat().st_size for path, _ in pdfs)),
+        ("extract_docx", lambda item: extract_text_from_docx(str(item[0])), docxs,
+         sum(path.stat().st_size for path, _ in docxs)),
+        ("detect_all_pii", detector.detect_all_pii, texts, text_bytes),
+        ("detect_names", detector.detect_names, texts, text_bytes),
+        ("remove_pii", lambda args: detector.remove_pii(*args), detected, text_bytes),
+        ("generate_asahi_cv", lambda args: generate_asahi_cv(args[0], logo, args[1][1].name, args[1][1].age),
+         list(zip(cleaned, pdfs)), sum(len(text.encode("utf-8")) for text in cleaned)),
+        ("save", lambda doc: doc.save(BytesIO()), generated, 0),
+        ("format_cv", lambda item: format_cv(item[0], item[0].name, item[1].name, item[1].age, pii_detector=detector),
+         pdfs + docxs, sum(path.stat().st_size for path, _ in documents)),
+    ]
+
+def run_suite(count, pages, repeat, seed):
+    detector = PIIDetector()
+    logo = load_logo_asset()
+    results = {"stages": {}, "leaks": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in pages:
+            documents = build_corpus(Path(tmp) / f"{page_count}p", count, [page_count], seed)
+            for stage, func, items, size in stage_cases(documents, detector, logo):
+                seconds, peak = measure(func, items, repeat)
+                results["stages"][f"{stage}@{page_count}p"] = {
+                    "docs_per_sec": len(items) / seconds,
+                    "mb_per_sec": size / seconds / 1e6,
+                    "peak_kib": peak / 1024,
+                }
+            leaks = []
+            for path, cv in documents:
+                cleaned_text, _ = clean_text(extract_text(path, path.name).text, detector)
+                leaks.extend(f"{path.name} {leak}" for leak in leaked_pii(cv, cleaned_text))
+            results["leaks"][f"{page_count}p"] = leaks
+    return results
+
+def compare(results, baseline, tolerance):
+    # Regression messages against a saved run; stages missing from either side are skipped
+    failures = []
+    for key, stats in results["stages"].items():
+        base = baseline["stages"].get(key)
+        if base and stats["docs_per_sec"] < base["docs_per_sec"] * (1 - tolerance):
+            failures.append(f"{key}: {stats['docs_per_sec']:.1f} docs/s vs baseline {base['docs_per_sec']:.1f}")
+    for key, leaks in results["leaks"].items():
+        base = baseline["leaks"].get(key)
+        if base is not None and len(leaks) > len(base):
+            failures.append(f"{key}: {len(leaks)} planted PII values leaked vs baseline {len(base)}")
+    return failures
+
+def print_results(results, baseline=None):
+    print(f"{'stage':<24} {'docs/s':>10} {'MB/s':>8} {'peak KiB':>10} {'vs base':>8}")
+    for key, stats in results["stages"].items():
+        base = (baseline or {}).get("stages", {}).get(key)
+        ratio = f"{stats['docs_per_sec'] / base['docs_per_sec']:.2f}x" if base else ""
+        print(f"{key:<24} {stats['docs_per_sec']:>10.1f} {stats['mb_per_sec']:>8.2f} "
+              f"{stats['peak_kib']:>10.0f} {ratio:>8}")
+    for key, leaks in results["leaks"].items():
+        print(f"leaked planted PII @{key}: {len(leaks)}")
+        for leak in leaks:
+            print(f"  {leak}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10, help="CVs per page size and format")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write this run's results as the baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="Fail if this run regresses against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed fractional drop in docs/sec before a stage counts as regressed")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.count, args.pages, args.repeat, args.seed)
+    results["config"] = {"count": args.count, "pages": args.pages, "repeat": args.repeat, "seed": args.seed,
+                         "python": platform.python_version(), "machine": platform.machine()}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+    if baseline:
+        if baseline.get("config", {}).get("seed") != args.seed:
+            print("warning: baseline was recorded with a different corpus seed", file=sys.stderr)
+        failures = compare(results, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            return 1
+        print(f"No regressions (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
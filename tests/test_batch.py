@@ -0,0 +1,43 @@
+# Runs with: python -m unittest discover tests
+import csv
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from asahi_cv import batch
+from asahi_cv.batch import format_one as real_format_one
+
+def crash_on_marked_file(job, output_dir):
+    # Kills the worker process like a MuPDF segfault or an OOM kill would, after the partial
+    # output has been created
+    if "Crash" in job["name"]:
+        Path(output_dir, job["output_name"] + ".part").write_bytes(b"partial")
+        os._exit(1)
+    return real_format_one(job, output_dir)
+
+class WorkerCrashTest(unittest.TestCase):
+    def test_report_is_written_when_a_worker_dies(self):
+        with tempfile.TemporaryDirectory() as directory:
+            intake = Path(directory, "intake")
+            output = Path(directory, "formatted")
+            intake.mkdir()
+            for name in ("Alice_Smith", "Crash_Me", "Bob_Jones", "Carol_White"):
+                Path(intake, name + ".pdf").write_bytes(b"%PDF-1.4 not really a PDF")
+
+            with mock.patch.object(batch, "format_one", crash_on_marked_file), \
+                    mock.patch("sys.stdout"), mock.patch("sys.stderr"):
+                exit_code = batch.main([str(intake), "-o", str(output), "--age", "30", "--workers", "2"])
+
+            self.assertEqual(exit_code, 1)
+            with open(output / "batch_report.csv", newline="", encoding="utf-8") as f:
+                rows = {Path(row["file"]).stem: row for row in csv.DictReader(f)}
+            self.assertEqual(set(rows), {"Alice_Smith", "Crash_Me", "Bob_Jones", "Carol_White"})
+            self.assertIn("BrokenProcessPool", rows["Crash_Me"]["error"])
+            for name in ("Alice_Smith", "Bob_Jones", "Carol_White"):
+                self.assertNotIn("BrokenProcessPool", rows[name]["error"])
+            self.assertEqual(list(output.glob("*.part")), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+# Runs with: python -m unittest discover tests
+import asyncio
+import unittest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from asahi_cv.service import FormatterService, LocalClient, Response, content_disposition
+
+class StubPool:
+    # Stands in for the process pool: jobs stay pending until the test finishes them
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.futures = []
+        self.closed = False
+
+    def submit(self, *args, **kwargs):
+        if self.broken:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        # Running, like a job a worker has picked up, so a timeout can't cancel it
+        future.set_running_or_notify_cancel()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.closed = True
+
+def post(service):
+    return LocalClient(service).post("/format", b"%PDF-1.4", name="John Doe", age=30, filename="cv.pdf")
+
+class BackpressureTest(unittest.IsolatedAsyncioTestCase):
+    async def test_busy_service_answers_429_until_the_worker_is_free(self):
+        service = FormatterService(workers=1, queue_size=0, timeout=0.05)
+        service._pool = pool = StubPool()
+        self.assertEqual((await post(service)).status, 504)
+        # The timed-out job still occupies the only worker
+        response = await post(service)
+        self.assertEqual(response.status, 429)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        pool.futures[0].set_exception(RuntimeError("finished after the timeout"))
+        await asyncio.sleep(0)
+        self.assertEqual(service.in_flight, 0)
+        self.assertEqual((await post(service)).status, 504)
+
+class PoolBreakageTest(unittest.IsolatedAsyncioTestCase):
+    async def test_broken_pool_on_submit_is_replaced_without_leaking_slots(self):
+        service = FormatterService(workers=1, queue_size=0)
+        for _ in range(3):
+            service._pool = pool = StubPool(broken=True)
+            response = await post(service)
+            self.assertEqual(response.status, 503)
+            self.assertTrue(pool.closed)
+            self.assertIsNone(service._pool)
+            self.assertEqual(service.in_flight, 0)
+
+    async def test_worker_crash_while_awaited_answers_503(self):
+        service = FormatterService(workers=1, queue_size=0)
+        service._pool = pool = StubPool()
+        request = asyncio.ensure_future(post(service))
+        await asyncio.sleep(0.01)
+        pool.futures[0].set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        self.assertEqual((await request).status, 503)
+        await asyncio.sleep(0)
+        self.assertIsNone(service._pool)
+        self.assertEqual(service.in_flight, 0)
+
+class HeaderTest(unittest.TestCase):
+    def test_japanese_output_name_encodes(self):
+        headers = {"Content-Disposition": content_disposition("Asahi_CV_山.太..docx"), "X-Warnings": "ページ 2:\nOCR failed"}
+        head = Response(200, b"", headers).encode(keep_alive=False).decode("latin-1")
+        self.assertIn('filename="Asahi_CV__._..docx"', head)
+        self.assertIn("filename*=UTF-8''Asahi_CV_%E5%B1%B1.%E5%A4%AA..docx", head)
+        self.assertIn("X-Warnings: ??? 2: OCR failed\r\n", head)
+
+if __name__ == "__main__":
+    unittest.main()